@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Python tools end to end against local API stand-ins.
+
+Starts bench/standins.py in-process, points the tools at it through
+GOOGLE_SEARCH_ENDPOINT, OLLAMA_HOST and YT_TRANSCRIPT_ENDPOINT, and runs
+every tool with a throwaway HOME and cache directory. For each tool it
+measures:
+
+    startup       interpreter start plus module import, in a fresh process
+    cli           end-to-end latency and peak RSS of the command line tool
+    concurrency   latency and throughput of the tool's function called
+                  from N threads of one process (as tool_server.py does)
+
+Results are printed as JSON with a stable layout, so two runs can be
+compared; --compare exits non-zero if any metric regressed by more than
+--tolerance.
+
+Each tool's startup also reports import_ms, the time its import adds to
+a bare interpreter start (fastest runs compared, as noise only adds),
+against a cold-start budget (STARTUP_BUDGET_MS); --check-budget exits
+non-zero if a tool is over.
+--startup-only skips the CLI and concurrency runs.
+
+Usage:
+    run.py [--latency 0.05] [--runs 10] [--concurrency 1,4,16]
+           [--tools google_search,...] [--output FILE]
+           [--compare BASELINE.json] [--tolerance 0.2]
+           [--startup-only] [--check-budget]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from standins import start_server
+
+TOOL_DIR = Path(__file__).resolve().parent.parent / "tool"
+
+VIDEO_URL = "https://www.youtube.com/watch?v=benchvideo1"
+SAMPLE_TEXT = (
+    "Benchmarks measure what the tools spend on top of the network: process "
+    "startup, imports, parsing, caching and writing results to disk.\n"
+) * 400
+
+# Cold-start budget: ms a tool's import may add to a bare interpreter.
+# Heavy dependencies (tiktoken, youtube_transcript_api, requests,
+# http.client) have to stay off the import path to fit.
+STARTUP_BUDGET_MS = {
+    "google_search": 60,
+    "get_transcript": 75,
+    "warmup_model": 60,
+    "count_tokens": 45,
+    "save_research": 45,
+    "save_yt_query": 45,
+}
+
+# Metrics where a larger value is an improvement
+HIGHER_IS_BETTER = ("ops_per_sec",)
+
+
+def percentile(values: list, pct: float) -> float | None:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_stats(seconds: list) -> dict:
+    """min/p50/p95/max of durations, in milliseconds."""
+    return {
+        "min_ms": round(min(seconds) * 1000, 2),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2),
+    }
+
+
+def bench_env(workdir: Path, endpoints: dict) -> dict:
+    """Environment isolating the tools from the user's caches and outputs."""
+    cache = workdir / "cache"
+    env = {
+        **os.environ,
+        **endpoints,
+        "HOME": str(workdir / "home"),
+        "XDG_CACHE_HOME": str(cache),
+        "OPENCODE_SEARCH_CACHE": str(cache / "search.sqlite3"),
+        "OPENCODE_TRANSCRIPT_CACHE": str(cache / "transcripts.sqlite3"),
+        "OPENCODE_TOKEN_CACHE": str(cache / "tokens.sqlite3"),
+        "OPENCODE_RESEARCH_INDEX": str(cache / "research_index.sqlite3"),
+        "GOOGLE_API_KEY": "bench",
+        "GOOGLE_CSE_ID": "bench",
+        "GOOGLE_SEARCH_RATE": "0",
+        "YT_TRANSCRIPT_RATE": "0",
+    }
+    # The real venv, so yt_transcript.py finds youtube_transcript_api
+    env.setdefault(
+        "OPENCODE_VENV", str(Path.home() / ".config" / "opencode" / ".venv")
+    )
+    (workdir / "home").mkdir(parents=True, exist_ok=True)
+    return env
+
+
+# Runs a tool script and reports its peak RSS on stderr at exit. Read
+# from /proc because ru_maxrss of an exec'd child includes the memory of
+# the (much larger) benchmark process it was forked from.
+RSS_PROBE = """
+import atexit, os, runpy, sys
+
+def report():
+    try:
+        with open("/proc/self/status") as f:
+            kb = int(next(l for l in f if l.startswith("VmHWM:")).split()[1])
+    except (OSError, StopIteration):
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            kb //= 1024
+    sys.stderr.write(f"\\nBENCH_PEAK_RSS_KB {kb}\\n")
+
+atexit.register(report)
+sys.argv.pop(0)
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def run_process(cmd: list, env: dict, cwd: Path, stdin: bytes = None) -> tuple:
+    """
+    Run a command to completion.
+
+    Returns:
+        Tuple of (seconds, exit code, stdout bytes, stderr bytes)
+    """
+    started = time.perf_counter()
+    proc = subprocess.run(
+        cmd, input=stdin or b"", capture_output=True, env=env, cwd=cwd
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, proc.returncode, proc.stdout, proc.stderr
+
+
+def peak_rss_mb(stderr: bytes) -> float | None:
+    """The peak RSS reported by RSS_PROBE, in MB."""
+    for line in reversed(stderr.decode(errors="replace").splitlines()):
+        if line.startswith("BENCH_PEAK_RSS_KB "):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+class Scenario:
+    """How to run one tool: its module, a CLI invocation and a function call."""
+
+    def __init__(self, name: str, module: str, cli, call, stdin=None):
+        self.name = name
+        self.module = module
+        self.cli = cli
+        self.call = call
+        self.stdin = stdin
+
+
+def scenarios(workdir: Path) -> list:
+    """Benchmark scenarios; i numbers each run so outputs stay distinct."""
+
+    def research_payload(i: int) -> dict:
+        return {
+            "topic": "bench research",
+            "content": f"Run {i}\n\n{SAMPLE_TEXT}",
+            "sources": [f"https://example.com/{n}" for n in range(10)],
+            "key_findings": [f"finding {n}" for n in range(5)],
+        }
+
+    text_file = workdir / "sample.txt"
+    text_file.write_text(SAMPLE_TEXT, encoding="utf-8")
+
+    return [
+        Scenario(
+            "google_search",
+            "google_search",
+            lambda i: ["google_search.py", f"bench query {i}", "20", "--no-cache"],
+            lambda mod, i: mod.google_search(f"bench query {i}", 20, use_cache=False),
+        ),
+        Scenario(
+            "get_transcript",
+            "yt_transcript",
+            lambda i: ["yt_transcript.py", VIDEO_URL, "--no-cache"],
+            lambda mod, i: mod.get_transcript(VIDEO_URL, use_cache=False),
+        ),
+        Scenario(
+            "warmup_model",
+            "warmup_ollama",
+            lambda i: ["warmup_ollama.py", "bench", "5m"],
+            lambda mod, i: mod.warmup_model("bench", "5m"),
+        ),
+        Scenario(
+            "count_tokens",
+            "count_tokens",
+            lambda i: ["count_tokens.py", "--json", "--no-cache", str(text_file)],
+            lambda mod, i: {"tokens": mod.count_tokens(f"{i} {SAMPLE_TEXT}")},
+        ),
+        Scenario(
+            "save_research",
+            "save_research",
+            lambda i: ["save_research.py", "--input", "-"],
+            lambda mod, i: mod.save_research(
+                **research_payload(i), base_dir=str(workdir)
+            ),
+            stdin=lambda i: json.dumps(research_payload(i)).encode(),
+        ),
+        Scenario(
+            "save_yt_query",
+            "save_yt_query",
+            lambda i: [
+                "save_yt_query.py",
+                VIDEO_URL,
+                "what are the main points",
+                f"Run {i}\n\n{SAMPLE_TEXT}",
+                "benchvideo1",
+            ],
+            lambda mod, i: mod.save_yt_query(
+                VIDEO_URL, "what are the main points", f"Run {i}\n\n{SAMPLE_TEXT}"
+            ),
+        ),
+    ]
+
+
+def _failed(output) -> str | None:
+    """The error a tool reported in its JSON output, if any."""
+    if isinstance(output, (bytes, str)):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            return None
+    if not isinstance(output, dict):
+        return None
+    if output.get("error"):
+        return str(output["error"])
+    # count_tokens.py --json reports failures per file
+    for entry in output.get("files", []):
+        if isinstance(entry, dict) and entry.get("error"):
+            return str(entry["error"])
+    return None
+
+
+def bench_startup(scenario: Scenario, env: dict, workdir: Path, runs: int) -> dict:
+    code = f"import sys; sys.path.insert(0, {str(TOOL_DIR)!r}); import {scenario.module}"
+    times = []
+    for _ in range(runs):
+        elapsed, exit_code, _, _ = run_process(
+            [sys.executable, "-c", code], env, workdir
+        )
+        if exit_code != 0:
+            return {"error": f"import {scenario.module} failed"}
+        times.append(elapsed)
+    return latency_stats(times)
+
+
+def bench_cli(scenario: Scenario, env: dict, workdir: Path, runs: int) -> dict:
+    times, rss = [], []
+    for i in range(runs):
+        cmd = scenario.cli(i)
+        cmd = [sys.executable, "-c", RSS_PROBE, str(TOOL_DIR / cmd[0]), *cmd[1:]]
+        stdin = scenario.stdin(i) if scenario.stdin else None
+        elapsed, code, output, stderr = run_process(cmd, env, workdir, stdin)
+        error = _failed(output)
+        if code != 0 or error:
+            return {"error": error or f"exit code {code}"}
+        times.append(elapsed)
+        rss.append(peak_rss_mb(stderr) or 0.0)
+    return {**latency_stats(times), "peak_rss_mb": round(max(rss), 1)}
+
+
+def bench_concurrency(scenario: Scenario, levels: list, runs: int) -> dict:
+    try:
+        module = __import__(scenario.module)
+    except Exception as e:
+        return {"error": f"import {scenario.module} failed: {e}"}
+
+    results = {}
+    calls = iter(range(1_000_000))
+    for level in levels:
+
+        def timed(_):
+            i = next(calls)
+            started = time.perf_counter()
+            output = scenario.call(module, i)
+            return time.perf_counter() - started, _failed(output)
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(level) as pool:
+                outcomes = list(pool.map(timed, range(runs * level)))
+            wall = time.perf_counter() - started
+        except Exception as e:
+            results[str(level)] = {"error": str(e)}
+            continue
+
+        errors = [error for _, error in outcomes if error]
+        if errors:
+            results[str(level)] = {"error": errors[0], "failed": len(errors)}
+            continue
+        results[str(level)] = {
+            **latency_stats([elapsed for elapsed, _ in outcomes]),
+            "ops_per_sec": round(len(outcomes) / wall, 2),
+        }
+    return results
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    server = start_server(latency=args.latency)
+    workdir = Path(tempfile.mkdtemp(prefix="opencode-bench-"))
+    env = bench_env(workdir, server.endpoints())
+
+    # In-process calls read the same settings as the subprocesses
+    os.environ.clear()
+    os.environ.update(env)
+    sys.path.insert(0, str(TOOL_DIR))
+
+    selected = set(args.tools.split(",")) if args.tools else None
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency_ms": round(args.latency * 1000, 2),
+            "runs": args.runs,
+            "concurrency": args.concurrency,
+        },
+        "interpreter": bench_startup(
+            Scenario("python", "sys", None, None), env, workdir, args.runs
+        ),
+        "tools": {},
+    }
+    baseline = report["interpreter"].get("min_ms")
+    for scenario in scenarios(workdir):
+        if selected and scenario.name not in selected:
+            continue
+        startup = bench_startup(scenario, env, workdir, args.runs)
+        if "min_ms" in startup and baseline is not None:
+            import_ms = round(startup["min_ms"] - baseline, 2)
+            budget = STARTUP_BUDGET_MS.get(scenario.name)
+            startup.update(
+                import_ms=import_ms,
+                budget_ms=budget,
+                within_budget=budget is None or import_ms <= budget,
+            )
+        report["tools"][scenario.name] = {"startup": startup}
+        if args.startup_only:
+            continue
+        report["tools"][scenario.name].update(
+            cli=bench_cli(scenario, env, workdir, args.runs),
+            concurrency=bench_concurrency(scenario, args.concurrency, args.runs),
+        )
+
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def flatten(report: dict, prefix: str = "") -> dict:
+    """Numeric metrics keyed by dotted path, e.g. tools.google_search.cli.p50_ms."""
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = value
+    return metrics
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Metrics that got worse than the baseline by more than tolerance.
+
+    Returns:
+        List of {"metric", "baseline", "current", "change"} dicts
+    """
+    current = flatten(report.get("tools", {}), "tools.")
+    previous = flatten(baseline.get("tools", {}), "tools.")
+    regressions = []
+    for metric, before in previous.items():
+        after = current.get(metric)
+        if after is None or not before:
+            continue
+        change = (after - before) / before
+        if metric.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > tolerance:
+            regressions.append(
+                {
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": round(change, 3),
+                }
+            )
+    return regressions
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds the stand-ins wait before answering")
+    parser.add_argument("--runs", type=int, default=10,
+                        help="runs per measurement (per thread for --concurrency)")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda s: [int(n) for n in s.split(",") if n],
+                        help="comma-separated thread counts")
+    parser.add_argument("--tools", help="comma-separated subset of tools")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="baseline report to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative regression (default 0.2)")
+    parser.add_argument("--startup-only", action="store_true",
+                        help="only measure startup")
+    parser.add_argument("--check-budget", action="store_true",
+                        help="fail if a tool's startup is over its budget")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    report = run_benchmarks(args)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    report["over_budget"] = [
+        name
+        for name, results in report["tools"].items()
+        if results["startup"].get("within_budget") is False
+    ]
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    failed = report.get("regressions") or (args.check_budget and report["over_budget"])
+    sys.exit(1 if failed else 0)
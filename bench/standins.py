@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the HTTP APIs the tools call, for offline benchmarks.
+
+One threaded server answers, on 127.0.0.1:
+    /customsearch/v1          Google Custom Search (GOOGLE_SEARCH_ENDPOINT)
+    /api/ps, /api/tags,       Ollama (OLLAMA_HOST)
+    /api/generate
+    /watch, /youtubei/v1/player, YouTube transcript flow
+    /api/timedtext            (YT_TRANSCRIPT_ENDPOINT)
+
+Every response is delayed by --latency seconds, so results reflect the
+tools' own overhead on top of a fixed, known network cost.
+
+Usage:
+    standins.py [--port N] [--latency 0.05]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "latency throughput cache token model transcript search result index "
+    "segment budget window request server client stream batch query"
+).split()
+
+TRANSCRIPT_SEGMENTS = 600
+GENERATE_TOKENS = 32
+
+
+def _sentence(seed: int, length: int = 12) -> str:
+    return " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(length))
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload: dict, status: int = 200) -> None:
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        body = self._read_body() if method == "POST" else {}
+        time.sleep(self.server.latency)
+
+        routes = {
+            "/customsearch/v1": self.custom_search,
+            "/api/ps": self.ollama_ps,
+            "/api/tags": self.ollama_tags,
+            "/api/generate": self.ollama_generate,
+            "/watch": self.youtube_watch,
+            "/youtubei/v1/player": self.youtube_player,
+            "/api/timedtext": self.youtube_timedtext,
+        }
+        handler = routes.get(url.path)
+        if handler is None:
+            self._json({"error": f"no stand-in for {url.path}"}, 404)
+            return
+        handler(params, body)
+
+    # Google Custom Search
+
+    def custom_search(self, params: dict, body: dict) -> None:
+        start = int(params.get("start", 1))
+        num = int(params.get("num", 10))
+        query = params.get("q", "")
+        items = [
+            {
+                "title": f"{query} result {i}",
+                "link": f"https://example.com/{i}?q={len(query)}",
+                "snippet": _sentence(i, 24),
+                "displayLink": "example.com",
+            }
+            for i in range(start, min(start + num, 101))
+        ]
+        self._json(
+            {"items": items, "searchInformation": {"totalResults": "100"}}
+        )
+
+    # Ollama
+
+    def ollama_ps(self, params: dict, body: dict) -> None:
+        with self.server.lock:
+            loaded = dict(self.server.loaded)
+        now = time.time()
+        models = [
+            {
+                "name": name,
+                "model": name,
+                "size": 4 * 1024**3,
+                "expires_at": time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(max(expires, now))
+                ),
+            }
+            for name, expires in loaded.items()
+            if expires > now
+        ]
+        self._json({"models": models})
+
+    def ollama_tags(self, params: dict, body: dict) -> None:
+        self._json({"models": [{"name": "bench:latest", "size": 4 * 1024**3}]})
+
+    def ollama_generate(self, params: dict, body: dict) -> None:
+        model = body.get("model", "bench")
+        if ":" not in model:
+            model += ":latest"
+        keep_alive = body.get("keep_alive", "5m")
+        with self.server.lock:
+            if keep_alive in (0, "0", "0s"):
+                self.server.loaded.pop(model, None)
+            else:
+                self.server.loaded[model] = time.time() + 3600
+
+        final = {
+            "model": model,
+            "done": True,
+            "load_duration": int(self.server.latency * 1e9),
+            "prompt_eval_count": len(body.get("prompt", "").split()),
+            "prompt_eval_duration": 1_000_000,
+        }
+        if not body.get("prompt"):
+            self._json(final)
+            return
+
+        count = min(int(body.get("options", {}).get("num_predict", GENERATE_TOKENS)),
+                    GENERATE_TOKENS)
+        final["eval_count"] = count
+        final["eval_duration"] = int(count * 0.002 * 1e9)
+        if body.get("stream") is False:
+            self._json({**final, "response": _sentence(count, count)})
+            return
+
+        # Stream NDJSON chunks, like the real server
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [
+            {"model": model, "response": WORDS[i % len(WORDS)] + " ", "done": False}
+            for i in range(count)
+        ] + [final]
+        for i, chunk in enumerate(chunks):
+            data = json.dumps(chunk).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            if i < count:
+                time.sleep(0.002)
+        self.wfile.write(b"0\r\n\r\n")
+
+    # YouTube transcript flow, as used by youtube_transcript_api
+
+    def youtube_watch(self, params: dict, body: dict) -> None:
+        html = '<html><script>ytcfg.set({"INNERTUBE_API_KEY": "bench"});</script></html>'
+        self._send(200, html.encode(), "text/html; charset=utf-8")
+
+    def youtube_player(self, params: dict, body: dict) -> None:
+        video_id = body.get("videoId", "")
+        track = {
+            "baseUrl": f"https://www.youtube.com/api/timedtext?v={video_id}&lang=en",
+            "name": {"runs": [{"text": "English"}]},
+            "languageCode": "en",
+            "isTranslatable": False,
+        }
+        self._json(
+            {
+                "playabilityStatus": {"status": "OK"},
+                "captions": {
+                    "playerCaptionsTracklistRenderer": {"captionTracks": [track]}
+                },
+            }
+        )
+
+    def youtube_timedtext(self, params: dict, body: dict) -> None:
+        parts = ["<?xml version=\"1.0\" encoding=\"utf-8\" ?><transcript>"]
+        for i in range(TRANSCRIPT_SEGMENTS):
+            parts.append(
+                f'<text start="{i * 2.5:.2f}" dur="2.5">{escape(_sentence(i))}</text>'
+            )
+        parts.append("</transcript>")
+        self._send(200, "".join(parts).encode(), "text/xml; charset=utf-8")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.loaded = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def endpoints(self) -> dict:
+        """Environment variables pointing the tools at this server."""
+        return {
+            "GOOGLE_SEARCH_ENDPOINT": f"{self.base_url}/customsearch/v1",
+            "OLLAMA_HOST": self.base_url,
+            "YT_TRANSCRIPT_ENDPOINT": self.base_url,
+        }
+
+
+def start_server(port: int = 0, latency: float = 0.0) -> StandInServer:
+    """Start a stand-in server on a background thread."""
+    server = StandInServer(port, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API stand-ins")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.latency)
+    print(json.dumps(server.endpoints(), indent=2), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -140,8 +140,14 @@ typeset -A TOOLS=(
     ["google_search"]="tool/google_search.py"
     ["save_research"]="tool/save_research.py"
     ["save_yt_query"]="tool/save_yt_query.py"
+    ["research_index"]="tool/research_index.py"
+    ["output_files"]="tool/output_files.py"
     ["warmup_ollama"]="tool/warmup_ollama.py"
     ["yt_transcript"]="tool/yt_transcript.py"
+    ["tool_config"]="tool/tool_config.py"
+    ["tool_metrics"]="tool/tool_metrics.py"
+    ["tool_server"]="tool/tool_server.py"
+    ["tool_client"]="tool/lib/tool_client.ts"
     ["ollama"]="tool/ollama.ts"
     ["research"]="tool/research.ts"
     ["youtube"]="tool/youtube.ts"
@@ -196,7 +202,14 @@ BUNDLE_RESEARCH=(
     "tool:google_search"
     "tool:save_research"
     "tool:save_yt_query"
+    "tool:research_index"
+    "tool:output_files"
     "tool:yt_transcript"
+    "tool:count_tokens"
+    "tool:tool_config"
+    "tool:tool_metrics"
+    "tool:tool_server"
+    "tool:tool_client"
     "tool:research"
     "tool:youtube"
 )
@@ -122,17 +122,18 @@ Status: ${entry.status || 'unknown'}`;
   /**
    * Fit content within token budget using priority-based truncation
    */
-  private fitWithinBudget(
+  private async fitWithinBudget(
     specSections: string[],
     acceptanceCriteria: string[],
     recentProgress: string[],
     filesToModify: string[]
-  ): {
+  ): Promise<{
     specSections: string[];
     acceptanceCriteria: string[];
     recentProgress: string[];
     filesToModify: string[];
-  } {
+    totalTokens: number;
+  }> {
     let currentTokens = 0;
     const result = {
       specSections: [] as string[],
@@ -141,6 +142,15 @@ Status: ${entry.status || 'unknown'}`;
       filesToModify: [] as string[]
     };
     
+    // Count every candidate exactly in one batch
+    const truncationMarker = '\n\n[... truncated for token budget ...]';
+    const candidates = [...acceptanceCriteria, ...filesToModify, ...recentProgress, ...specSections, truncationMarker];
+    const counted = await TokenCounter.countTokensBatch(candidates);
+    const tokenCounts = new Map<string, number>();
+    candidates.forEach((text, i) => tokenCounts.set(text, counted[i].tokens));
+    const countTokens = (text: string) => tokenCounts.get(text) ?? TokenCounter.estimateTokens(text);
+    const wouldExceedBudget = (text: string, maxTokens: number) => currentTokens + countTokens(text) > maxTokens;
+    
     // Reserve tokens for each section (priority order)
     const reservedTokens = {
       acceptanceCriteria: Math.floor(this.maxTokens * 0.15), // 15% - most important
@@ -151,46 +161,46 @@ Status: ${entry.status || 'unknown'}`;
     
     // Add acceptance criteria (highest priority)
     for (const criterion of acceptanceCriteria) {
-      if (!TokenCounter.wouldExceedBudget(currentTokens, criterion, reservedTokens.acceptanceCriteria)) {
+      if (!wouldExceedBudget(criterion, reservedTokens.acceptanceCriteria)) {
         result.acceptanceCriteria.push(criterion);
-        currentTokens += TokenCounter.estimateTokens(criterion);
+        currentTokens += countTokens(criterion);
       }
     }
     
     // Add files to modify (critical for implementation)
     for (const file of filesToModify) {
-      if (!TokenCounter.wouldExceedBudget(currentTokens, file, reservedTokens.filesToModify)) {
+      if (!wouldExceedBudget(file, reservedTokens.filesToModify)) {
         result.filesToModify.push(file);
-        currentTokens += TokenCounter.estimateTokens(file);
+        currentTokens += countTokens(file);
       }
     }
     
     // Add recent progress (important for context)
     for (const progress of recentProgress) {
-      if (!TokenCounter.wouldExceedBudget(currentTokens, progress, reservedTokens.recentProgress)) {
+      if (!wouldExceedBudget(progress, reservedTokens.recentProgress)) {
         result.recentProgress.push(progress);
-        currentTokens += TokenCounter.estimateTokens(progress);
+        currentTokens += countTokens(progress);
       }
     }
     
     // Add spec sections (fill remaining space)
-    const remainingTokens = this.maxTokens - currentTokens;
     for (const section of specSections) {
-      if (!TokenCounter.wouldExceedBudget(currentTokens, section, this.maxTokens)) {
+      if (!wouldExceedBudget(section, this.maxTokens)) {
         result.specSections.push(section);
-        currentTokens += TokenCounter.estimateTokens(section);
+        currentTokens += countTokens(section);
       } else {
-        // Try to fit a truncated version
-        const availableTokens = this.maxTokens - currentTokens;
+        // Try to fit a truncated version, leaving room for the marker
+        const availableTokens = this.maxTokens - currentTokens - countTokens(truncationMarker);
         if (availableTokens > 100) { // Only if we have meaningful space left
-          const truncated = TokenCounter.truncateToTokenBudget(section, availableTokens);
-          result.specSections.push(truncated + '\n\n[... truncated for token budget ...]');
+          const [truncated] = await TokenCounter.countTokensBatch([section], availableTokens);
+          result.specSections.push((truncated.text ?? section) + truncationMarker);
+          currentTokens += (truncated.kept_tokens ?? truncated.tokens) + countTokens(truncationMarker);
           break; // Stop adding more sections
         }
       }
     }
     
-    return result;
+    return { ...result, totalTokens: currentTokens };
   }
 
   /**
@@ -223,15 +233,7 @@ Status: ${entry.status || 'unknown'}`;
     }
     
     // Fit everything within token budget
-    const fitted = this.fitWithinBudget(specSections, acceptanceCriteria, recentProgress, filesToModify);
-    
-    // Calculate total tokens
-    const totalTokens = TokenCounter.estimateTokensForArray([
-      ...fitted.specSections,
-      ...fitted.acceptanceCriteria,
-      ...fitted.recentProgress,
-      ...fitted.filesToModify
-    ]);
+    const fitted = await this.fitWithinBudget(specSections, acceptanceCriteria, recentProgress, filesToModify);
     
     return {
       taskId,
@@ -239,7 +241,7 @@ Status: ${entry.status || 'unknown'}`;
       acceptanceCriteria: fitted.acceptanceCriteria,
       filesToModify: fitted.filesToModify,
       recentProgress: fitted.recentProgress,
-      totalTokens
+      totalTokens: fitted.totalTokens
     };
   }
 }
\ No newline at end of file
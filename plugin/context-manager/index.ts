@@ -115,7 +115,7 @@ export default class ContextManagerPlugin {
    */
   async getTokenCount(params: { text: string }): Promise<{ tokens: number }> {
     const { text } = params;
-    const tokens = TokenCounter.estimateTokens(text);
+    const [{ tokens }] = await TokenCounter.countTokensBatch([text]);
     
     console.log(`[ContextManager] Token count: ${tokens} for ${text.length} characters`);
     
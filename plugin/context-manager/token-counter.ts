@@ -1,23 +1,56 @@
+import { TokenBudgetResult } from './types.js';
+
+type CallTool = (method: string, params: Record<string, unknown>) => Promise<any>;
+
 /**
  * Token counting utility for context bundle size estimation
  */
 export class TokenCounter {
   private static readonly CHARS_PER_TOKEN = 4; // Fallback estimation
 
+  // Installed with the tools; loaded at runtime so the plugin still works without them
+  private static readonly TOOL_CLIENT = `${process.env.HOME}/.config/opencode/tool/lib/tool_client.ts`;
+  private static callTool: Promise<CallTool | undefined> | undefined;
+
   /**
-   * Estimate token count for given text
-   * Uses tiktoken if available, falls back to character/4 estimation
+   * Estimate token count for given text using character/4 estimation
+   * (see countTokensBatch for exact counts)
    */
   static estimateTokens(text: string): number {
-    // Try to use tiktoken if available
-    try {
-      // This would require tiktoken package, but we're avoiding dependencies
-      // For now, use character-based estimation
-      return Math.ceil(text.length / this.CHARS_PER_TOKEN);
-    } catch {
-      // Fallback to character-based estimation
-      return Math.ceil(text.length / this.CHARS_PER_TOKEN);
+    return Math.ceil(text.length / this.CHARS_PER_TOKEN);
+  }
+
+  /**
+   * Count tokens exactly for many texts in one request, truncating any text
+   * over its budget at a token boundary (preferring paragraph, line or word
+   * breaks). Uses tiktoken through the persistent tool server, and falls
+   * back to estimation when the server is unavailable.
+   */
+  static async countTokensBatch(texts: string[], maxTokens?: number | number[]): Promise<TokenBudgetResult[]> {
+    if (texts.length === 0) {
+      return [];
     }
+
+    this.callTool ??= import(this.TOOL_CLIENT)
+      .then(module => module.callTool as CallTool)
+      .catch(() => undefined);
+    const callTool = await this.callTool;
+    if (callTool) {
+      const served = await callTool('budget_tokens', { texts, max_tokens: maxTokens ?? null });
+      if (served && Array.isArray(served.texts)) {
+        return served.texts;
+      }
+    }
+
+    return texts.map((text, i) => {
+      const budget = Array.isArray(maxTokens) ? maxTokens[i] : maxTokens;
+      const tokens = this.estimateTokens(text);
+      if (budget === undefined || budget === null || tokens <= budget) {
+        return { tokens };
+      }
+      const truncated = this.truncateToTokenBudget(text, budget);
+      return { tokens, truncated: true, text: truncated, kept_tokens: this.estimateTokens(truncated) };
+    });
   }
 
   /**
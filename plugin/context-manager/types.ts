@@ -37,4 +37,11 @@ export interface AcceptanceCriterion {
   id: string;
   description: string;
   taskId?: string;
-}
\ No newline at end of file
+}
+
+export interface TokenBudgetResult {
+  tokens: number;
+  truncated?: boolean;
+  text?: string;
+  kept_tokens?: number;
+}
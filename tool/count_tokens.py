@@ -7,18 +7,172 @@ Counts exact tokens in text files using tiktoken (Claude/GPT-4 tokenizer).
 Usage:
     uv run python tool/count_tokens.py <file_path>
     uv run python tool/count_tokens.py <file_path1> <file_path2> ...
+    uv run python tool/count_tokens.py --jobs N <file_path1> <file_path2> ...
+    uv run python tool/count_tokens.py --texts <file|-> [--max-tokens N]
+
+Options:
+    --jobs N          Count files in N worker processes (0 = one per CPU core)
+    --no-cache        Bypass the on-disk token count cache
+    --stream          Read every file in bounded chunks (automatic above 16 MB)
+    --json            Print all results and totals as one JSON document
+    --ndjson          Print one JSON record per file as soon as it is counted
+    --recursive DIR   Count every file under DIR (repeatable)
+    --include GLOB    With --recursive, only count matching files (repeatable)
+    --exclude GLOB    With --recursive, skip matching files and directories
+    --texts FILE|-    Count a JSON list of strings (or {"texts": [...],
+                      "max_tokens": N | [N, ...]}) in one batch, printing
+                      one JSON result per text
+    --max-tokens N    With --texts, truncate each text to N tokens
+    --seed-encoding [FILE]
+                      Install the tokenizer file for offline use: copy FILE
+                      (a .tiktoken file) into the encoding cache, or without
+                      FILE, copy it from tiktoken's temporary cache or
+                      download it
+
+Counts are cached by (content hash, encoding) in
+~/.cache/opencode/count_tokens.sqlite3 (override with
+OPENCODE_TOKEN_CACHE), keeping the most recently used entries.
+
+tiktoken downloads its tokenizer file on first use. Unless
+TIKTOKEN_CACHE_DIR is set, it is kept in ~/.cache/opencode/tiktoken
+rather than tiktoken's default temporary directory, so after one
+download (or --seed-encoding) counting works offline. tiktoken itself is
+only imported once text is actually tokenized.
 
 Examples:
     uv run python tool/count_tokens.py agent/orchestrator.md
     uv run python tool/count_tokens.py agent/*.md
+    uv run python tool/count_tokens.py --jobs 0 agent/*.md skill/**/*.md
+    uv run python tool/count_tokens.py --ndjson --recursive . --include '*.md' --exclude node_modules
 """
 
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
 import sys
-import tiktoken
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from fnmatch import fnmatch
+from functools import lru_cache, partial
+from itertools import chain
 from pathlib import Path
 
+import tool_metrics
+
+DEFAULT_ENCODING = "cl100k_base"
+
+CACHE_PATH = Path(
+    os.environ.get(
+        "OPENCODE_TOKEN_CACHE",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "opencode"
+        / "count_tokens.sqlite3",
+    )
+)
+CACHE_MAX_ENTRIES = 50_000
+
+# Persistent home for tiktoken's downloaded tokenizer files
+ENCODING_CACHE = Path(
+    os.environ.get("TIKTOKEN_CACHE_DIR")
+    or Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "opencode"
+    / "tiktoken"
+)
+ENCODING_URLS = {
+    name: f"https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+    for name in ("cl100k_base", "o200k_base", "p50k_base", "r50k_base")
+}
+
+# Truncation cuts at a paragraph, line or word break when one falls in
+# the last fifth of the kept text, else at the exact token boundary
+TRUNCATE_BREAKS = ("\n\n", "\n", " ")
+TRUNCATE_BREAK_WINDOW = 0.2
+
+# Files above this size are counted in chunks to keep memory bounded
+STREAM_THRESHOLD = 16 * 1024 * 1024
+STREAM_CHUNK_CHARS = 1024 * 1024
+# Exact chunk boundaries, which tiktoken's pre-tokenizer and str.split()
+# never merge across: after a newline when the next line is not blank
+# (matched from the start of that line), and before the space between two
+# letters (matched from the first letter)
+LINE_CUT = re.compile(r"[^\S\r\n]*\S")
+WORD_CUT = re.compile(r"[A-Za-z] [A-Za-z]")
+# Past this many chunks' worth of text without either, cut anyway
+STREAM_MAX_PENDING = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding_name: str = DEFAULT_ENCODING) -> "tiktoken.Encoding":
+    """
+    Get a tiktoken encoder, loading it at most once per process.
+
+    Args:
+        encoding_name: Tokenizer encoding name
+
+    Returns:
+        Cached tiktoken Encoding
+    """
+    with tool_metrics.span("encoder"):
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(ENCODING_CACHE))
+        import tiktoken
+
+        return tiktoken.get_encoding(encoding_name)
+
+
+def encoding_cache_path(encoding_name: str = DEFAULT_ENCODING) -> Path:
+    """Where tiktoken looks for an encoding's tokenizer file."""
+    url = ENCODING_URLS[encoding_name]
+    return ENCODING_CACHE / hashlib.sha1(url.encode()).hexdigest()
+
 
-def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+def seed_encoding(encoding_name: str = DEFAULT_ENCODING, source: str = None) -> dict:
+    """
+    Put an encoding's tokenizer file in the cache for offline use.
+
+    Args:
+        encoding_name: Encoding to install
+        source: A downloaded .tiktoken file; without one, the copy in
+            tiktoken's temporary cache is used if present, else the file
+            is downloaded
+
+    Returns:
+        dict with the cache path and vocabulary size, or error
+    """
+    if encoding_name not in ENCODING_URLS:
+        return {"error": f"Unknown encoding: {encoding_name}"}
+    target = encoding_cache_path(encoding_name)
+    legacy = Path(tempfile.gettempdir()) / "data-gym-cache" / target.name
+    if source is None and not target.exists() and legacy.exists():
+        source = str(legacy)
+
+    try:
+        if source is not None:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+        # Loading checks the file's hash (and downloads it if missing)
+        get_encoder.cache_clear()
+        encoder = get_encoder(encoding_name)
+    except Exception as e:
+        if source is not None and not target.exists():
+            # tiktoken deletes a cached file whose hash does not match
+            return {"error": f"{source} is not the {encoding_name} tokenizer file"}
+        return {"error": f"Could not seed {encoding_name}: {str(e)}"}
+    return {
+        "encoding": encoding_name,
+        "path": str(target),
+        "vocabulary": encoder.n_vocab,
+    }
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
     """
     Count tokens in text using tiktoken.
 
@@ -29,17 +183,313 @@ def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
     Returns:
         Number of tokens
     """
-    enc = tiktoken.get_encoding(encoding_name)
+    enc = get_encoder(encoding_name)
     tokens = enc.encode(text)
     return len(tokens)
 
 
-def count_file_tokens(file_path: str) -> dict:
+def truncate_to_tokens(
+    text: str,
+    max_tokens: int,
+    encoding_name: str = DEFAULT_ENCODING,
+    tokens: list = None,
+) -> tuple:
+    """
+    Cut text to at most max_tokens tokens, preferring a natural break.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        encoding_name: Tokenizer encoding
+        tokens: text's tokens, if already encoded
+
+    Returns:
+        Tuple of (text, token count); the text is returned unchanged
+        when it already fits
+    """
+    enc = get_encoder(encoding_name)
+    if tokens is None:
+        tokens = enc.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+
+    keep = max_tokens
+    while keep > 0:
+        # A cut inside a multi-byte character drops the partial character
+        prefix = enc.decode_bytes(tokens[:keep]).decode("utf-8", errors="ignore")
+        floor = int(len(prefix) * (1 - TRUNCATE_BREAK_WINDOW))
+        for separator in TRUNCATE_BREAKS:
+            cut = prefix.rfind(separator, floor)
+            if cut > 0:
+                prefix = prefix[:cut]
+                break
+
+        # Re-encoding a cut prefix can merge differently; verify the count
+        count = len(enc.encode_ordinary(prefix))
+        if count <= max_tokens:
+            return prefix, count
+        keep -= count - max_tokens
+    return "", 0
+
+
+def budget_texts(
+    texts: list, max_tokens=None, encoding_name: str = DEFAULT_ENCODING
+) -> list:
+    """
+    Count many texts in one batch, truncating those over budget.
+
+    Args:
+        texts: Strings to count
+        max_tokens: None, one budget for every text, or one per text
+        encoding_name: Tokenizer encoding
+
+    Returns:
+        One dict per text with "tokens". Texts over budget also get
+        "truncated": True, the cut "text" and its "kept_tokens".
+
+    Raises:
+        ValueError: If max_tokens is a list of a different length than texts
+    """
+    if not isinstance(max_tokens, list):
+        max_tokens = [max_tokens] * len(texts)
+    elif len(max_tokens) != len(texts):
+        raise ValueError("max_tokens must have one entry per text")
+    enc = get_encoder(encoding_name)
+
+    with tool_metrics.span("encode"):
+        batch = enc.encode_ordinary_batch(texts)
+
+    results = []
+    for text, tokens, budget in zip(texts, batch, max_tokens):
+        result = {"tokens": len(tokens)}
+        if budget is not None and len(tokens) > budget:
+            kept, kept_tokens = truncate_to_tokens(text, budget, encoding_name, tokens)
+            result.update(truncated=True, text=kept, kept_tokens=kept_tokens)
+        results.append(result)
+    return results
+
+
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_cache() -> sqlite3.Connection | None:
+    """
+    Open the token count cache, once per process.
+
+    The connection is shared by every thread (tool_server.py serves each
+    request on its own); statements on it are serialized by _cache_lock.
+
+    Returns:
+        SQLite connection, or None if the cache cannot be opened
+    """
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            CACHE_PATH, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS token_counts (
+                digest TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                words INTEGER NOT NULL,
+                chars INTEGER NOT NULL,
+                lines INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (digest, encoding)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS token_counts_last_used "
+            "ON token_counts (last_used)"
+        )
+        return conn
+    except sqlite3.Error:
+        return None
+
+
+def cache_get(digest: str, encoding_name: str) -> tuple | None:
+    """Look up cached (tokens, words, chars, lines) for a content digest."""
+    conn = get_cache()
+    if conn is None:
+        return None
+    try:
+        with _cache_lock:
+            row = conn.execute(
+                "SELECT tokens, words, chars, lines FROM token_counts "
+                "WHERE digest = ? AND encoding = ?",
+                (digest, encoding_name),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE token_counts SET last_used = ? "
+                    "WHERE digest = ? AND encoding = ?",
+                    (time.time(), digest, encoding_name),
+                )
+        return row
+    except sqlite3.Error:
+        return None
+
+
+def cache_put(digest: str, encoding_name: str, counts: tuple) -> None:
+    """Store (tokens, words, chars, lines) for a content digest."""
+    conn = get_cache()
+    if conn is None:
+        return
+    try:
+        with _cache_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO token_counts "
+                "(digest, encoding, tokens, words, chars, lines, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (digest, encoding_name, *counts, time.time()),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def prune_cache(max_entries: int = CACHE_MAX_ENTRIES) -> None:
+    """Evict least recently used cache entries beyond max_entries."""
+    conn = get_cache()
+    if conn is None:
+        return
+    try:
+        with _cache_lock:
+            conn.execute(
+                "DELETE FROM token_counts WHERE rowid IN ("
+                "SELECT rowid FROM token_counts ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def iter_text_chunks(
+    path: Path, chunk_chars: int = STREAM_CHUNK_CHARS, inexact: list = None
+):
+    """
+    Read a text file in bounded chunks that tokenize independently.
+
+    Chunks end just before a line that is not blank (it may be indented)
+    or, failing that, between two words. tiktoken never merges tokens
+    across either boundary and str.split() never joins words across it,
+    so summing per-chunk counts gives exactly the whole-file counts.
+
+    Only text with neither boundary in STREAM_MAX_PENDING chunks' worth
+    (e.g. minified data with no spaces) is cut at the last newline or
+    whitespace instead, which may change its token count by one or two.
+    Each such cut is recorded in inexact.
+
+    Args:
+        path: File to read (decoded as UTF-8 with universal newlines)
+        chunk_chars: Approximate number of characters per chunk
+        inexact: If given, the file offset of every inexact cut is
+            appended to it
+
+    Yields:
+        Consecutive text chunks covering the whole file
+    """
+    pending = ""
+    offset = 0
+    # Newlines before this offset have been ruled out as cut points
+    scan_from = 0
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(chunk_chars)
+            if not block:
+                break
+            pending += block
+
+            cut = _line_cut(pending, scan_from)
+            if cut == -1:
+                cut = _word_cut(pending)
+            if cut == -1 and len(pending) > STREAM_MAX_PENDING * chunk_chars:
+                cut = _forced_cut(pending)
+                if inexact is not None:
+                    inexact.append(offset + cut)
+            if cut != -1:
+                yield pending[:cut]
+                pending = pending[cut:]
+                offset += cut
+                scan_from = 0
+            # Only a trailing newline can still become a cut point
+            last = pending.rfind("\n", scan_from)
+            scan_from = last if last != -1 else len(pending)
+
+    if pending:
+        yield pending
+
+
+def _line_cut(text: str, start: int) -> int:
+    """Length of text up to its last exact line boundary, or -1."""
+    cut = text.rfind("\n", start)
+    while cut != -1 and not LINE_CUT.match(text, cut + 1):
+        cut = text.rfind("\n", start, cut)
+    return cut + 1 if cut != -1 else -1
+
+
+def _word_cut(text: str) -> int:
+    """Length of text up to the space before its last word break, or -1."""
+    cut = text.rfind(" ")
+    while cut > 0 and not WORD_CUT.match(text, cut - 1):
+        cut = text.rfind(" ", 0, cut)
+    return cut if cut > 0 else -1
+
+
+def _forced_cut(text: str) -> int:
+    """Length of text up to its last newline or whitespace, for inexact cuts."""
+    cut = text.rfind("\n")
+    if cut == -1:
+        cut = max(text.rfind(" "), text.rfind("\t"))
+    return cut + 1 if cut != -1 else len(text)
+
+
+def count_chunks(chunks, encoding_name: str = DEFAULT_ENCODING) -> tuple:
+    """
+    Accumulate counts over text chunks.
+
+    Args:
+        chunks: Iterable of text chunks (see iter_text_chunks)
+        encoding_name: Tokenizer encoding
+
+    Returns:
+        Tuple of (tokens, words, chars, lines)
+    """
+    tokens = words = chars = newlines = 0
+    for chunk in chunks:
+        tokens += count_tokens(chunk, encoding_name)
+        words += len(chunk.split())
+        chars += len(chunk)
+        newlines += chunk.count("\n")
+    return tokens, words, chars, newlines + 1
+
+
+def file_digest(path: Path) -> str:
+    """Hash a file's bytes without loading it all into memory."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(STREAM_CHUNK_CHARS):
+            h.update(block)
+    return h.hexdigest()
+
+
+def count_file_tokens(
+    file_path: str, use_cache: bool = True, stream: bool | None = None
+) -> dict:
     """
     Count tokens in a file.
 
     Args:
         file_path: Path to the file
+        use_cache: Reuse and record counts in the on-disk cache
+        stream: Read in bounded chunks instead of all at once
+            (default: only for files larger than STREAM_THRESHOLD bytes)
 
     Returns:
         Dictionary with file stats
@@ -50,15 +500,43 @@ def count_file_tokens(file_path: str) -> dict:
         return {"file": file_path, "error": "File not found"}
 
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
+        if stream is None:
+            stream = path.stat().st_size > STREAM_THRESHOLD
+
+        with tool_metrics.span("read"):
+            if stream:
+                data = None
+                digest = file_digest(path)
+            else:
+                data = path.read_bytes()
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                tool_metrics.count("bytes_in", len(data))
+
+        counts = None
+        inexact = []
+        if use_cache:
+            with tool_metrics.span("cache"):
+                counts = cache_get(digest, DEFAULT_ENCODING)
+            tool_metrics.count("cache_hits" if counts else "cache_misses")
+        if counts is None:
+            # Load the encoder first so its span does not nest in encode
+            get_encoder(DEFAULT_ENCODING)
+            with tool_metrics.span("encode"):
+                if stream:
+                    counts = count_chunks(iter_text_chunks(path, inexact=inexact))
+                else:
+                    # Same newline handling as reading in text mode
+                    content = data.decode("utf-8")
+                    content = content.replace("\r\n", "\n").replace("\r", "\n")
+                    counts = count_chunks([content])
+            # Only exact counts are cached, so a cache hit is always exact
+            if use_cache and not inexact:
+                with tool_metrics.span("cache"):
+                    cache_put(digest, DEFAULT_ENCODING, counts)
 
-        tokens = count_tokens(content)
-        words = len(content.split())
-        chars = len(content)
-        lines = content.count("\n") + 1
+        tokens, words, chars, lines = counts
 
-        return {
+        result = {
             "file": file_path,
             "tokens": tokens,
             "words": words,
@@ -67,29 +545,232 @@ def count_file_tokens(file_path: str) -> dict:
             "chars_per_token": round(chars / tokens, 2) if tokens > 0 else 0,
             "tokens_per_word": round(tokens / words, 2) if words > 0 else 0,
         }
+        if inexact:
+            # Streamed text with no exact chunk boundary (see iter_text_chunks)
+            result["exact"] = False
+        return result
     except Exception as e:
         return {"file": file_path, "error": str(e)}
 
 
+def iter_tree(root: str, include: list = None, exclude: list = None):
+    """
+    Lazily walk a directory tree with os.scandir.
+
+    Patterns are matched with fnmatch against both the entry name and its
+    path relative to root. Excluded directories are not descended into.
+    Entries are visited in sorted order per directory; symlinked
+    directories are not followed.
+
+    Args:
+        root: Directory to walk
+        include: Glob patterns a file must match (default: all files)
+        exclude: Glob patterns for files and directories to skip
+
+    Yields:
+        File paths under root
+    """
+    include = include or ["*"]
+    exclude = exclude or []
+
+    def matches(patterns: list, name: str, rel_path: str) -> bool:
+        return any(fnmatch(name, p) or fnmatch(rel_path, p) for p in patterns)
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+            if matches(exclude, entry.name, rel_path):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file() and matches(include, entry.name, rel_path):
+                yield entry.path
+
+        # Reversed so the stack pops subdirectories in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def iter_count_files_tokens(
+    file_paths, jobs: int = 1, use_cache: bool = True, stream: bool | None = None
+):
+    """
+    Count tokens in many files, yielding each result as soon as it is ready.
+
+    file_paths may be any iterable (e.g. iter_tree()); it is consumed
+    lazily and at most a few files per worker are in flight at once.
+    Each worker process loads the encoder once and reuses it for every
+    file it is handed. Results keep the order of file_paths.
+
+    Args:
+        file_paths: Paths to count
+        jobs: Number of worker processes (0 = one per CPU core, 1 = serial)
+        use_cache: Reuse and record counts in the on-disk cache
+        stream: Force (True) or disable (False) chunked reading
+
+    Yields:
+        Per-file stat dictionaries
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if isinstance(file_paths, (list, tuple)):
+        jobs = min(jobs, len(file_paths))
+    count = partial(count_file_tokens, use_cache=use_cache, stream=stream)
+
+    if jobs <= 1:
+        for file_path in file_paths:
+            yield count(file_path)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for file_path in file_paths:
+                pending.append(executor.submit(count, file_path))
+                if len(pending) >= jobs * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    if use_cache:
+        prune_cache()
+
+
+def count_files_tokens(
+    file_paths: list, jobs: int = 1, use_cache: bool = True, stream: bool | None = None
+) -> list:
+    """
+    Count tokens in many files, optionally across worker processes.
+
+    Args:
+        file_paths: Paths to count
+        jobs: Number of worker processes (0 = one per CPU core, 1 = serial)
+        use_cache: Reuse and record counts in the on-disk cache
+        stream: Force (True) or disable (False) chunked reading
+
+    Returns:
+        List of per-file stat dictionaries, in the order of file_paths
+    """
+    return list(iter_count_files_tokens(file_paths, jobs, use_cache, stream))
+
+
+def summarize(results: list) -> dict:
+    """Total the counts of successfully counted files."""
+    counted = [r for r in results if "error" not in r]
+    return {
+        "files": len(counted),
+        "errors": len(results) - len(counted),
+        "tokens": sum(r["tokens"] for r in counted),
+        "words": sum(r["words"] for r in counted),
+        "chars": sum(r["chars"] for r in counted),
+        "lines": sum(r["lines"] for r in counted),
+    }
+
+
 def format_number(num: int) -> str:
     """Format number with thousands separator."""
     return f"{num:,}"
 
 
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-h", "--help", action="store_true")
+    parser.add_argument("--jobs", "-j", type=int, default=1)
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false")
+    parser.add_argument("--stream", action="store_true", default=None)
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true")
+    output.add_argument("--ndjson", action="store_true")
+    parser.add_argument("--recursive", "-r", action="append", default=[])
+    parser.add_argument("--include", action="append")
+    parser.add_argument("--exclude", action="append")
+    parser.add_argument("--texts")
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--seed-encoding", nargs="?", const="")
+    parser.add_argument("files", nargs="*")
+    return parser.parse_args(argv)
+
+
+def read_texts(source: str, max_tokens: int = None) -> tuple:
+    """
+    Read a --texts payload from a file or stdin ("-").
+
+    Returns:
+        Tuple of (texts, max_tokens)
+
+    Raises:
+        OSError, ValueError: If the input cannot be read or is malformed
+    """
+    if source == "-":
+        payload = json.load(sys.stdin)
+    else:
+        with open(source, encoding="utf-8") as f:
+            payload = json.load(f)
+    if isinstance(payload, dict):
+        max_tokens = payload.get("max_tokens", max_tokens)
+        payload = payload.get("texts")
+    if not isinstance(payload, list) or not all(isinstance(t, str) for t in payload):
+        raise ValueError("expected a list of strings")
+    if isinstance(max_tokens, list) and len(max_tokens) != len(payload):
+        raise ValueError("max_tokens must have one entry per text")
+    return payload, max_tokens
+
+
 def main():
-    if len(sys.argv) < 2:
+    tool_metrics.start("count_tokens")
+    args = parse_args(sys.argv[1:])
+    if args.seed_encoding is not None:
+        result = seed_encoding(source=args.seed_encoding or None)
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if "error" in result else 0)
+
+    if args.texts:
+        try:
+            texts, max_tokens = read_texts(args.texts, args.max_tokens)
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": f"Invalid texts input: {str(e)}"}))
+            sys.exit(1)
+        print(json.dumps({"texts": budget_texts(texts, max_tokens)}))
+        return
+
+    if args.help or not (args.files or args.recursive) or args.jobs < 0:
         print(__doc__)
         sys.exit(1)
 
-    file_paths = sys.argv[1:]
-    results = []
+    file_paths = args.files
+    if args.recursive:
+        file_paths = chain(
+            file_paths,
+            *(iter_tree(d, args.include, args.exclude) for d in args.recursive),
+        )
 
-    for file_path in file_paths:
-        result = count_file_tokens(file_path)
-        results.append(result)
+    results = iter_count_files_tokens(
+        file_paths, jobs=args.jobs, use_cache=args.use_cache, stream=args.stream
+    )
+
+    if args.ndjson:
+        # One record per file as soon as it is counted
+        for result in results:
+            print(json.dumps(result), flush=True)
+        return
+
+    results = list(results)
+
+    if args.json:
+        print(json.dumps({"files": results, "total": summarize(results)}, indent=2))
+        return
 
     # Print results
-    if len(results) == 1:
+    if len(results) == 1 and not args.recursive:
         # Single file - detailed output
         result = results[0]
         if "error" in result:
@@ -105,6 +786,8 @@ def main():
         print(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
         print(f"📊 Chars/token:  {result['chars_per_token']}")
         print(f"📊 Tokens/word:  {result['tokens_per_word']}")
+        if result.get("exact") is False:
+            print("⚠️  Token count may be off slightly (no exact chunk boundary)")
     else:
         # Multiple files - table output
         print(f"📊 Token Count Summary")
@@ -2,54 +2,195 @@
 """
 Google Custom Search API tool for OpenCode research agent.
 Searches the web and returns formatted results.
+
+Successful responses are cached on disk, keyed by (query, num, cx), in
+~/.cache/opencode/google_search.sqlite3 (override with
+OPENCODE_SEARCH_CACHE). Tunable through the environment or .env:
+
+    GOOGLE_SEARCH_CACHE_TTL     Seconds a result stays fresh (default 3600)
+    GOOGLE_SEARCH_CACHE_SIZE    Max cached queries, LRU evicted (default 1000)
+    GOOGLE_SEARCH_CACHE_STALE   Seconds past the TTL a stale result may be
+                                served while it is refreshed in the
+                                background (default 0 = never); a
+                                command line run waits up to
+                                REFRESH_JOIN_SECONDS at exit for it
+    GOOGLE_SEARCH_ENDPOINT      API URL (default
+                                https://www.googleapis.com/customsearch/v1;
+                                point at a local stand-in for offline runs;
+                                process environment only, never .env)
+
+Usage:
+    google_search.py <query> [num_results] [--no-cache]
+    google_search.py --batch <queries.json | -> [--no-cache]
+    google_search.py --cache-stats
+
+Batch mode reads a JSON array or one query per line (from a file, or
+stdin with "-"), runs GOOGLE_SEARCH_BATCH_WORKERS queries at once
+(default 4) and prints one NDJSON record per query as it completes.
 """
 
 import json
 import os
+import queue
+import random
+import sqlite3
 import sys
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urlencode
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
-
-
-# Load GOOGLE_API_KEY from .config/ai-workflows/.env
-def load_env():
-    # Try multiple possible locations
-    env_paths = [
-        Path.home() / ".config" / "ai-workflows" / ".env",
-        Path.home() / "ai-workflow" / ".env",
-        Path.cwd() / ".env",
-    ]
-
-    for env_path in env_paths:
-        if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        key, value = line.split("=", 1)
-                        os.environ[key.strip()] = value.strip().strip('"').strip("'")
-            break
+from urllib.parse import urlencode, urlsplit
+
+import tool_metrics
+from tool_config import get_settings
+
+
+CACHE_PATH = Path(
+    os.environ.get(
+        "OPENCODE_SEARCH_CACHE",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "opencode"
+        / "google_search.sqlite3",
+    )
+)
 
+# The API returns at most 10 results per request and 100 per query
+PAGE_SIZE = 10
+MAX_RESULTS = 100
+MAX_PAGE_WORKERS = 5
 
-def google_search(query: str, num_results: int = 10) -> dict:
+# How long a command line run waits at exit for background refreshes
+REFRESH_JOIN_SECONDS = 3.0
+
+_cache_lock = threading.Lock()
+# Keys with a background refresh in flight, and the threads running them
+_refreshing = set()
+_refresh_threads = []
+
+
+@lru_cache(maxsize=None)
+def get_cache() -> sqlite3.Connection | None:
+    """
+    Open the search response cache, once per process.
+
+    Returns:
+        SQLite connection, or None if the cache cannot be opened
+    """
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            CACHE_PATH, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        return conn
+    except sqlite3.Error:
+        return None
+
+
+def _cache_execute(sql: str, params: tuple = ()) -> list:
+    """Run a statement on the shared cache connection; [] if unavailable."""
+    conn = get_cache()
+    if conn is None:
+        return []
+    try:
+        with _cache_lock:
+            return conn.execute(sql, params).fetchall()
+    except sqlite3.Error:
+        return []
+
+
+def _record_stat(name: str) -> None:
+    _cache_execute(
+        "INSERT INTO stats (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def cache_get(key: str) -> tuple | None:
+    """Return (response, age_seconds) for a cached key, or None."""
+    rows = _cache_execute(
+        "SELECT response, fetched_at FROM responses WHERE key = ?", (key,)
+    )
+    if not rows:
+        return None
+    now = time.time()
+    _cache_execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+    response, fetched_at = rows[0]
+    return json.loads(response), now - fetched_at
+
+
+def cache_put(key: str, response: dict, max_entries: int) -> None:
+    """Store a response and evict least recently used entries past max_entries."""
+    now = time.time()
+    _cache_execute(
+        "INSERT OR REPLACE INTO responses (key, response, fetched_at, last_used) "
+        "VALUES (?, ?, ?, ?)",
+        (key, json.dumps(response), now, now),
+    )
+    _cache_execute(
+        "DELETE FROM responses WHERE key IN ("
+        "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+        (max_entries,),
+    )
+
+
+def cache_stats() -> dict:
+    """
+    Report search cache effectiveness.
+
+    Returns:
+        dict with hit/miss counters, hit ratio and entry count
+    """
+    stats = dict(_cache_execute("SELECT name, value FROM stats"))
+    hits = stats.get("hits", 0) + stats.get("stale_hits", 0)
+    lookups = hits + stats.get("misses", 0)
+    entries = _cache_execute("SELECT COUNT(*) FROM responses")
+    return {
+        "hits": stats.get("hits", 0),
+        "stale_hits": stats.get("stale_hits", 0),
+        "misses": stats.get("misses", 0),
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0,
+        "entries": entries[0][0] if entries else 0,
+        "path": str(CACHE_PATH),
+    }
+
+
+def google_search(
+    query: str, num_results: int = 10, use_cache: bool = True, cwd: str = None
+) -> dict:
     """
     Perform a Google Custom Search.
 
     Args:
         query: Search query string
-        num_results: Number of results to return (max 10 per request)
+        num_results: Number of results to return (1-100, fetched 10 per page)
+        use_cache: Serve and record results in the on-disk response cache
+        cwd: Directory whose .env applies (default: the current directory)
 
     Returns:
         dict with search results or error
     """
-    load_env()
+    settings = get_settings(cwd)
 
-    api_key = os.environ.get("GOOGLE_API_KEY")
+    api_key = settings.google_api_key
     # Google Custom Search Engine ID - you'll need to create one at:
     # https://programmablesearchengine.google.com/
-    search_engine_id = os.environ.get("GOOGLE_CSE_ID", "")
+    search_engine_id = settings.google_cse_id
 
     if not api_key:
         return {"error": "GOOGLE_API_KEY not found in ai-workflow/.env"}
@@ -60,57 +201,436 @@ def google_search(query: str, num_results: int = 10) -> dict:
             "error": "GOOGLE_CSE_ID not found. Create a Custom Search Engine at https://programmablesearchengine.google.com/ and add GOOGLE_CSE_ID to ai-workflow/.env"
         }
 
+    # JSON callers may send a float such as 10.0
+    num = max(1, min(int(num_results), MAX_RESULTS))
+    if not use_cache:
+        return fetch_results(query, num, api_key, search_engine_id, cwd)
+
+    ttl = settings.google_search_cache_ttl
+    stale = settings.google_search_cache_stale
+    max_entries = settings.google_search_cache_size
+    key = json.dumps([query, num, search_engine_id])
+
+    with tool_metrics.span("cache"):
+        cached = cache_get(key)
+    if cached is not None:
+        response, age = cached
+        if age <= ttl:
+            _record_stat("hits")
+            tool_metrics.count("cache_hits")
+            return response
+        if age <= ttl + stale:
+            # Serve the stale copy now and refresh it for the next caller
+            _record_stat("stale_hits")
+            tool_metrics.count("cache_hits")
+            _start_refresh(
+                key, query, num, api_key, search_engine_id, max_entries, cwd
+            )
+            return response
+
+    _record_stat("misses")
+    tool_metrics.count("cache_misses")
+    result = fetch_results(query, num, api_key, search_engine_id, cwd)
+    if "error" not in result and not result.get("partial"):
+        with tool_metrics.span("cache"):
+            cache_put(key, result, max_entries)
+    return result
+
+
+def _start_refresh(key: str, *args) -> None:
+    """Refresh a stale entry on a daemon thread, at most once per key at a time."""
+    with _cache_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+        _refresh_threads[:] = [t for t in _refresh_threads if t.is_alive()]
+        thread = threading.Thread(
+            target=tool_metrics.wrap(_refresh), args=(key, *args), daemon=True
+        )
+        _refresh_threads.append(thread)
+    thread.start()
+
+
+def _refresh(
+    key: str,
+    query: str,
+    num: int,
+    api_key: str,
+    cx: str,
+    max_entries: int,
+    cwd: str = None,
+) -> None:
+    try:
+        result = fetch_results(query, num, api_key, cx, cwd)
+        if "error" not in result and not result.get("partial"):
+            cache_put(key, result, max_entries)
+    finally:
+        with _cache_lock:
+            _refreshing.discard(key)
+
+
+def wait_for_refreshes(timeout: float = REFRESH_JOIN_SECONDS) -> None:
+    """Give background refreshes up to timeout seconds in total to finish."""
+    deadline = time.monotonic() + timeout
+    with _cache_lock:
+        threads = list(_refresh_threads)
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+
+class RateLimiter:
+    """Space out calls so at most `rate` start per second across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Idle keep-alive connections per (scheme, host)
+_connections = {}
+# Process-wide limiters, one per GOOGLE_SEARCH_RATE value in use
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _rate_limiter(rate: float) -> RateLimiter:
+    """Return the shared limiter for a rate, creating it on first use."""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(rate)
+        if limiter is None:
+            limiter = _rate_limiters[rate] = RateLimiter(rate)
+        return limiter
+
+
+def _request(url: str) -> tuple:
+    """
+    GET url over a pooled keep-alive HTTP(S) connection.
+
+    Returns:
+        Tuple of (status, reason, headers, body bytes)
+    """
+    import http.client
+
+    parts = urlsplit(url)
+    pool = _connections.setdefault((parts.scheme, parts.netloc), queue.LifoQueue())
+    path = f"{parts.path}?{parts.query}"
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        if parts.scheme == "http":
+            conn = http.client.HTTPConnection(parts.netloc, timeout=30)
+        else:
+            conn = http.client.HTTPSConnection(parts.netloc, timeout=30)
+        try:
+            # TCP (and TLS) setup, timed apart from the request itself
+            with tool_metrics.span("connect"):
+                conn.connect()
+        except Exception:
+            conn.close()
+            raise
+
+    try:
+        with tool_metrics.span("network"):
+            conn.request(
+                "GET", path, headers={"User-Agent": "OpenCode-Research-Agent/1.0"}
+            )
+            response = conn.getresponse()
+            body = response.read()
+    except Exception:
+        conn.close()
+        raise
+    tool_metrics.count("bytes_out", len(path))
+    tool_metrics.count("bytes_in", len(body))
+
+    if response.will_close:
+        conn.close()
+    else:
+        pool.put(conn)
+    return response.status, response.reason, response.headers, body
+
+
+def fetch_page(
+    query: str, start: int, num: int, api_key: str, cx: str, cwd: str = None
+) -> dict:
+    """
+    Fetch one page of results from the Custom Search API.
+
+    Requests share a pool of keep-alive connections and a process-wide
+    rate limit (GOOGLE_SEARCH_RATE requests/second, default 10). HTTP 429,
+    5xx responses and connection failures are retried up to
+    GOOGLE_SEARCH_RETRIES times (default 3) with exponential backoff,
+    honouring Retry-After.
+
+    Args:
+        query: Search query string
+        start: 1-based index of the first result on the page
+        num: Number of results on the page (1-10)
+        api_key: Google API key
+        cx: Custom Search Engine ID
+        cwd: Directory whose .env applies (default: the current directory)
+
+    Returns:
+        Raw API response dict, or dict with error
+    """
+    # Deferred so cached searches never load http.client (and ssl)
+    import http.client
+
     # Build the API URL
     params = {
         "key": api_key,
-        "cx": search_engine_id,
+        "cx": cx,
         "q": query,
-        "num": min(num_results, 10),
+        "num": num,
     }
+    if start > 1:
+        params["start"] = start
 
-    url = f"https://www.googleapis.com/customsearch/v1?{urlencode(params)}"
+    settings = get_settings(cwd)
+    url = f"{settings.google_search_endpoint}?{urlencode(params)}"
+    retries = settings.google_search_retries
+    rate_limiter = _rate_limiter(settings.google_search_rate)
 
-    try:
-        req = Request(url, headers={"User-Agent": "OpenCode-Research-Agent/1.0"})
-        with urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode())
-
-            results = []
-            for item in data.get("items", []):
-                results.append(
-                    {
-                        "title": item.get("title", ""),
-                        "link": item.get("link", ""),
-                        "snippet": item.get("snippet", ""),
-                        "displayLink": item.get("displayLink", ""),
-                    }
-                )
-
-            return {
-                "query": query,
-                "totalResults": data.get("searchInformation", {}).get(
-                    "totalResults", "0"
-                ),
-                "results": results,
-            }
-
-    except HTTPError as e:
-        return {"error": f"HTTP Error {e.code}: {e.reason}"}
-    except URLError as e:
-        return {"error": f"URL Error: {e.reason}"}
-    except json.JSONDecodeError as e:
-        return {"error": f"JSON decode error: {str(e)}"}
-    except Exception as e:
-        return {"error": f"Unexpected error: {str(e)}"}
+    for attempt in range(retries + 1):
+        delay = 0.5 * 2**attempt * (1 + random.random() / 2)
+        rate_limiter.wait()
+        try:
+            status, reason, headers, body = _request(url)
+        except (OSError, http.client.HTTPException) as e:
+            error = {"error": f"URL Error: {e}"}
+        except Exception as e:
+            return {"error": f"Unexpected error: {str(e)}"}
+        else:
+            if status < 400:
+                try:
+                    with tool_metrics.span("parse"):
+                        return json.loads(body.decode())
+                except json.JSONDecodeError as e:
+                    return {"error": f"JSON decode error: {str(e)}"}
+            error = {"error": f"HTTP Error {status}: {reason}"}
+            if status != 429 and status < 500:
+                return error
+            retry_after = headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = float(retry_after)
+
+        if attempt < retries:
+            time.sleep(delay)
+
+    return error
+
+
+def fetch_results(
+    query: str, num: int, api_key: str, cx: str, cwd: str = None
+) -> dict:
+    """
+    Call the Custom Search API, bypassing the cache.
+
+    Requests for more than one page are split into pages of up to 10
+    results (via the API's start parameter) and fetched concurrently.
+    Pages are merged in rank order and de-duplicated by link. If a later
+    page fails, the results ranked before it are still returned, marked
+    "partial" so they are not cached.
+
+    Args:
+        query: Search query string
+        num: Number of results to request (1-100)
+        api_key: Google API key
+        cx: Custom Search Engine ID
+        cwd: Directory whose .env applies (default: the current directory)
+
+    Returns:
+        dict with search results or error
+    """
+    starts = range(1, num + 1, PAGE_SIZE)
+    pages = [(start, min(PAGE_SIZE, num - start + 1)) for start in starts]
+
+    if len(pages) == 1:
+        responses = [fetch_page(query, 1, num, api_key, cx, cwd)]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(len(pages), MAX_PAGE_WORKERS)) as pool:
+            fetch = tool_metrics.wrap(
+                lambda page: fetch_page(query, *page, api_key, cx, cwd)
+            )
+            responses = list(pool.map(fetch, pages))
+
+    if "error" in responses[0]:
+        return responses[0]
+
+    results = []
+    seen = set()
+    partial = False
+    for data in responses:
+        if "error" in data:
+            partial = True
+            break
+        for item in data.get("items", []):
+            link = item.get("link", "")
+            if link in seen:
+                continue
+            seen.add(link)
+            results.append(
+                {
+                    "title": item.get("title", ""),
+                    "link": link,
+                    "snippet": item.get("snippet", ""),
+                    "displayLink": item.get("displayLink", ""),
+                }
+            )
+        if len(data.get("items", [])) < PAGE_SIZE:
+            # Short page: there is nothing ranked after it
+            break
+
+    result = {
+        "query": query,
+        "totalResults": responses[0].get("searchInformation", {}).get(
+            "totalResults", "0"
+        ),
+        "results": results[:num],
+    }
+    if partial:
+        result["partial"] = True
+    return result
+
+
+def read_batch(source) -> list:
+    """
+    Parse a batch of queries.
+
+    Accepts a JSON array, or one query per line (plain text or JSON).
+    Each query is a string or an object with "query" and optional
+    "num_results".
+
+    Args:
+        source: File object to read from
+
+    Returns:
+        List of (query, num_results) tuples
+
+    Raises:
+        ValueError: If the input is not valid JSON
+        KeyError: If an object has no "query"
+        TypeError: If a query is not a string or num_results not an integer
+    """
+    text = source.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        entries = json.loads(stripped)
+    else:
+        entries = [
+            json.loads(line) if line.startswith("{") else line
+            for line in (raw.strip() for raw in text.splitlines())
+            if line
+        ]
+
+    batch = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            query, num_results = entry["query"], entry.get("num_results", 10)
+            if not isinstance(query, str):
+                raise TypeError(f"query must be a string, got {query!r}")
+            if (
+                isinstance(num_results, bool)
+                or not isinstance(num_results, (int, float))
+                or (isinstance(num_results, float) and not num_results.is_integer())
+            ):
+                raise TypeError(f"num_results must be an integer, got {num_results!r}")
+            batch.append((query, int(num_results)))
+        else:
+            batch.append((str(entry), 10))
+    return batch
+
+
+def search_batch(
+    batch: list, use_cache: bool = True, workers: int = 4, cwd: str = None
+):
+    """
+    Run many searches concurrently, yielding results as they complete.
+
+    Each query is isolated: a failure is reported in its own record and
+    does not affect the others.
+
+    Args:
+        batch: List of (query, num_results) tuples
+        use_cache: Serve and record results in the response cache
+        workers: Number of queries in flight at once
+        cwd: Directory whose .env applies (default: the current directory)
+
+    Yields:
+        Result dicts with the batch "index" and "query" added
+    """
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def run(index: int, query: str, num_results: int) -> dict:
+        try:
+            result = google_search(query, num_results, use_cache, cwd)
+        except Exception as e:
+            result = {"error": f"Unexpected error: {str(e)}"}
+        return {"index": index, "query": query, **result}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(tool_metrics.wrap(run), index, query, num_results)
+            for index, (query, num_results) in enumerate(batch)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: google_search.py <query> [num_results]"}))
+    tool_metrics.start("google_search")
+    args = sys.argv[1:]
+    if "--cache-stats" in args:
+        print(json.dumps(cache_stats(), indent=2))
+        sys.exit(0)
+
+    if "--batch" in args:
+        # google_search.py --batch <file.json | -> [--no-cache]
+        position = args.index("--batch")
+        source = args[position + 1] if len(args) > position + 1 else "-"
+        try:
+            if source == "-":
+                batch = read_batch(sys.stdin)
+            else:
+                with open(source) as f:
+                    batch = read_batch(f)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(json.dumps({"error": f"Invalid batch input: {str(e)}"}))
+            sys.exit(1)
+
+        workers = get_settings().google_search_batch_workers
+        for record in search_batch(batch, "--no-cache" not in args, workers):
+            print(json.dumps(record), flush=True)
+        wait_for_refreshes()
+        sys.exit(0)
+
+    use_cache = "--no-cache" not in args
+    args = [a for a in args if a != "--no-cache"]
+
+    if len(args) < 1:
+        print(
+            json.dumps(
+                {"error": "Usage: google_search.py <query> [num_results] [--no-cache]"}
+            )
+        )
         sys.exit(1)
 
-    query = sys.argv[1]
-    num_results = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    query = args[0]
+    num_results = int(args[1]) if len(args) > 1 else 10
 
-    result = google_search(query, num_results)
-    print(json.dumps(result, indent=2))
+    result = google_search(query, num_results, use_cache)
+    print(json.dumps(result, indent=2), flush=True)
+    wait_for_refreshes()
@@ -0,0 +1,145 @@
+import { connect } from "node:net"
+import { spawn } from "node:child_process"
+import { existsSync, lstatSync } from "node:fs"
+
+const TOOL_DIR = `${process.env.HOME}/.config/opencode/tool`
+const VENV_PYTHON = `${process.env.HOME}/.config/opencode/.venv/bin/python`
+
+// Shared /tmp is only used through a directory private to this user
+const PRIVATE_DIR = `/tmp/opencode-tools-${process.getuid?.() ?? 0}`
+const SOCKET_PATH =
+  process.env.OPENCODE_TOOL_SOCKET ||
+  (process.env.XDG_RUNTIME_DIR
+    ? `${process.env.XDG_RUNTIME_DIR}/opencode-tools.sock`
+    : `${PRIVATE_DIR}/tools.sock`)
+
+const START_TIMEOUT_MS = 3000
+const PING_TIMEOUT_MS = 500
+// Longer than any timeout the server applies itself (a cold model load in
+// warmup_ollama may take LOAD_TIMEOUT = 120 s), so the server answers first
+const REQUEST_TIMEOUT_MS = 300_000
+
+class RequestTimeout extends Error {}
+class SocketUntrusted extends Error {}
+
+let nextId = 1
+
+/**
+ * Check that no other user can have planted the socket: in the /tmp
+ * fallback, its directory must be ours and closed to everyone else.
+ */
+function socketTrusted(): boolean {
+  if (SOCKET_PATH !== `${PRIVATE_DIR}/tools.sock`) return true
+  try {
+    const dir = lstatSync(PRIVATE_DIR)
+    return dir.isDirectory() && dir.uid === process.getuid?.() && (dir.mode & 0o077) === 0
+  } catch {
+    return false
+  }
+}
+
+/**
+ * Send one JSON-RPC request to the tool server.
+ * Rejects if the socket cannot be reached or trusted, or with a
+ * RequestTimeout if no response arrives within timeoutMs.
+ */
+function request(
+  method: string,
+  params: Record<string, unknown>,
+  timeoutMs: number = REQUEST_TIMEOUT_MS,
+): Promise<any> {
+  return new Promise((resolve, reject) => {
+    if (!socketTrusted()) {
+      reject(new SocketUntrusted(`${PRIVATE_DIR} is not a directory private to this user`))
+      return
+    }
+    const socket = connect(SOCKET_PATH)
+    let buffer = ""
+
+    socket.setEncoding("utf8")
+    socket.setTimeout(timeoutMs, () => {
+      socket.destroy()
+      reject(new RequestTimeout(`Tool server did not answer ${method} within ${timeoutMs} ms`))
+    })
+    socket.on("connect", () => {
+      const payload = { jsonrpc: "2.0", id: nextId++, method, params, cwd: process.cwd() }
+      socket.write(JSON.stringify(payload) + "\n")
+    })
+    socket.on("data", (chunk: string) => {
+      buffer += chunk
+      const newline = buffer.indexOf("\n")
+      if (newline === -1) return
+      socket.end()
+      try {
+        const response = JSON.parse(buffer.slice(0, newline))
+        resolve(response.error ? { error: response.error.message } : response.result)
+      } catch (e) {
+        reject(e)
+      }
+    })
+    socket.on("error", reject)
+    socket.on("close", () => reject(new Error("Tool server closed the connection")))
+  })
+}
+
+/**
+ * Start the tool server in the background and wait for its socket.
+ */
+async function startServer(): Promise<boolean> {
+  const python = existsSync(VENV_PYTHON) ? VENV_PYTHON : "python3"
+  const child = spawn(python, [`${TOOL_DIR}/tool_server.py`], { detached: true, stdio: "ignore" })
+  child.unref()
+
+  const deadline = Date.now() + START_TIMEOUT_MS
+  while (Date.now() < deadline) {
+    await Bun.sleep(50)
+    try {
+      await request("ping", {}, PING_TIMEOUT_MS)
+      return true
+    } catch {
+      // Not listening yet
+    }
+  }
+  return false
+}
+
+/**
+ * Whether a request failed before reaching the server, so the tool did
+ * not run and running the script instead cannot repeat its work.
+ */
+function unreachable(e: unknown): boolean {
+  const code = (e as NodeJS.ErrnoException)?.code
+  return e instanceof SocketUntrusted || code === "ENOENT" || code === "ECONNREFUSED"
+}
+
+/**
+ * Report a request the server accepted but did not answer cleanly.
+ */
+function failure(e: unknown): { error: string } {
+  if (e instanceof RequestTimeout) return { error: "tool server timed out" }
+  return { error: `tool server failed: ${e instanceof Error ? e.message : String(e)}` }
+}
+
+/**
+ * Call a tool through the persistent tool server, starting it on demand.
+ * Returns undefined when the server cannot be reached (or is disabled with
+ * OPENCODE_TOOL_SERVER=0) so callers can fall back to running the script.
+ * Once a request has reached the server, a timeout or broken reply is
+ * returned as an error instead: the tool may already have run.
+ */
+export async function callTool(method: string, params: Record<string, unknown>): Promise<any> {
+  if (process.env.OPENCODE_TOOL_SERVER === "0") return undefined
+
+  try {
+    return await request(method, params)
+  } catch (e) {
+    if (!unreachable(e)) return failure(e)
+    if (!(await startServer())) return undefined
+  }
+
+  try {
+    return await request(method, params)
+  } catch (e) {
+    return unreachable(e) ? undefined : failure(e)
+  }
+}
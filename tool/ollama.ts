@@ -1,4 +1,5 @@
 import { tool } from "@opencode-ai/plugin"
+import { callTool } from "./lib/tool_client"
 
 const TOOL_DIR = `${process.env.HOME}/.config/opencode/tool`
 
@@ -8,13 +9,43 @@ const TOOL_DIR = `${process.env.HOME}/.config/opencode/tool`
 export const warmup = tool({
   description: "Warm up an Ollama model to reduce response latency. Call this before using a local model.",
   args: {
-    model: tool.schema.string().optional().describe("Model name to warm up (default: qwen3:30b)"),
-    keepalive: tool.schema.string().optional().describe("How long to keep model loaded (default: 60m)")
+    model: tool.schema.string().optional().describe("Model name to warm up (default: OLLAMA_MODEL or qwen3:30b)"),
+    keepalive: tool.schema.string().optional().describe("How long to keep model loaded (default: OLLAMA_KEEPALIVE or 60m)")
   },
   async execute(args) {
-    const model = args.model || "qwen3:30b"
-    const keepalive = args.keepalive || "60m"
+    // Empty values fall back to the configured defaults
+    const model = args.model || ""
+    const keepalive = args.keepalive || ""
+    const served = await callTool("warmup_model", { model, keepalive })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
     const result = await Bun.$`python3 ${TOOL_DIR}/warmup_ollama.py ${model} ${keepalive}`.text()
     return result.trim()
   }
 })
+
+/**
+ * Keep a pool of Ollama models warm
+ */
+export const warm_pool = tool({
+  description: "Load several Ollama models concurrently, skipping ones already loaded and staying within the memory budget. Renews keep_alive for models about to expire.",
+  args: {
+    models: tool.schema.array(tool.schema.string()).optional().describe("Models to keep loaded (default: OLLAMA_MODELS)"),
+    keepalive: tool.schema.string().optional().describe("How long to keep models loaded (default: OLLAMA_KEEPALIVE or 60m)"),
+    budget_gb: tool.schema.number().optional().describe("Memory budget in GB, 0 for unlimited (default: OLLAMA_MEMORY_BUDGET_GB)")
+  },
+  async execute(args) {
+    const served = await callTool("warm_pool", {
+      models: args.models,
+      keepalive: args.keepalive,
+      budget_gb: args.budget_gb
+    })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
+    const flags = []
+    if (args.keepalive) flags.push("--keepalive", args.keepalive)
+    if (args.budget_gb !== undefined) flags.push("--budget-gb", String(args.budget_gb))
+    const result = await Bun.$`python3 ${TOOL_DIR}/warmup_ollama.py --pool ${args.models || []} ${flags}`.text()
+    return result.trim()
+  }
+})
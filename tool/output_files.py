@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Versioned output files shared by save_research.py and save_yt_query.py.
+
+Each filename pattern in an output directory has a small manifest,
+.versions/<pattern>.json, recording the last version handed out, so
+allocating the next version costs the same no matter how many files the
+directory holds, and a save only reads and rewrites its own pattern's
+manifest. Allocation runs under an flock on .versions/<pattern>.lock and
+claims the file with an exclusive create, so concurrent saves never
+share a _vN file, even alongside files written by older versions of the
+tools. A directory-wide .versions.json left by older versions seeds a
+pattern's manifest the first time it is used.
+
+The manifest also records a digest of each version's body (everything
+but the version number and timestamps the writer stamps) for the newest
+MAX_DIGESTS versions. Saving a body identical to one of them returns
+that version instead of writing a new file.
+
+Outputs are written to a temporary file in the same directory and
+renamed into place, so readers never see a partially written report.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import tool_metrics
+
+MANIFEST_DIR = ".versions"
+# Directory-wide manifest of all patterns, written by older versions
+LEGACY_MANIFEST_NAME = ".versions.json"
+
+# Body digests remembered per filename pattern (newest versions win)
+MAX_DIGESTS = 256
+
+
+def _read_manifest(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _write_manifest(path: Path, manifest: dict) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def body_digest(lines, stamped: tuple = ()) -> str:
+    """
+    Hash an output's lines, ignoring the frontmatter the writer stamps.
+
+    The version and timestamps differ between otherwise identical saves,
+    so the first frontmatter line for each stamped key is left out;
+    everything else, including user metadata under the same key names,
+    is hashed.
+
+    Args:
+        lines: Lines of the document, as passed to write_lines()
+        stamped: Frontmatter keys the writer sets on every save,
+            e.g. ("version", "created")
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    pending = {f"{key}:" for key in stamped}
+    in_frontmatter = False
+    for i, line in enumerate(lines):
+        if i == 0:
+            in_frontmatter = line == "---"
+        elif in_frontmatter and line == "---":
+            in_frontmatter = False
+        elif in_frontmatter and pending:
+            prefix = line.split(":", 1)[0] + ":"
+            if prefix in pending:
+                pending.discard(prefix)
+                continue
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _same_body(path: Path, digest: str, stamped: tuple) -> bool:
+    """Check that a previously saved file still has the given body."""
+    try:
+        # As written: no newline translation, so \r\n in content survives
+        with open(path, encoding="utf-8", newline="") as f:
+            text = f.read()
+    except OSError:
+        return False
+    return body_digest(text.split("\n"), stamped) == digest
+
+
+def _prune_digests(output_dir: Path, name_format: str, digests: dict) -> None:
+    """Forget deleted versions, then all but the newest MAX_DIGESTS."""
+    for digest, version in list(digests.items()):
+        if not (output_dir / name_format.format(version=version)).exists():
+            del digests[digest]
+    by_age = sorted(digests, key=digests.get)
+    for digest in by_age[: max(0, len(by_age) - MAX_DIGESTS)]:
+        del digests[digest]
+
+
+def allocate_version(
+    output_dir: Path, name_format: str, digest: str = None, stamped: tuple = ()
+) -> tuple:
+    """
+    Claim the next free version of a versioned filename.
+
+    Args:
+        output_dir: Directory the file lives in (created if missing)
+        name_format: Filename with a {version} placeholder, e.g. "output_v{version}.md"
+        digest: body_digest() of the new output; if an existing version
+            has the same body, it is returned instead of a new one
+        stamped: The stamped keys digest was computed with
+
+    Returns:
+        Tuple of (version, path, duplicate). Unless duplicate is True,
+        path exists as an empty placeholder for the new output; pass
+        the version to release_version() if it cannot be written.
+    """
+    manifest_dir = output_dir / MANIFEST_DIR
+    manifest_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = manifest_dir / f"{name_format}.json"
+
+    with open(manifest_dir / f"{name_format}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if manifest_path.exists():
+            entry = _read_manifest(manifest_path)
+        else:
+            legacy = _read_manifest(output_dir / LEGACY_MANIFEST_NAME)
+            entry = legacy.get(name_format, {})
+        if not isinstance(entry, dict):
+            entry = {"version": int(entry)}
+        digests = entry.setdefault("digests", {})
+
+        if digest in digests:
+            version = digests[digest]
+            path = output_dir / name_format.format(version=version)
+            if _same_body(path, digest, stamped):
+                return version, path, True
+            # Edited or deleted since it was saved
+            del digests[digest]
+
+        version = int(entry.get("version", 0)) + 1
+        while True:
+            path = output_dir / name_format.format(version=version)
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                break
+            except FileExistsError:
+                # Written without the manifest (older tools or by hand)
+                version += 1
+
+        entry["version"] = version
+        if digest is not None:
+            digests[digest] = version
+            if len(digests) > MAX_DIGESTS:
+                _prune_digests(output_dir, name_format, digests)
+        _write_manifest(manifest_path, entry)
+
+    return version, path, False
+
+
+def release_version(
+    output_dir: Path, name_format: str, version: int, digest: str = None
+) -> None:
+    """
+    Give up a version claimed by allocate_version() whose write failed.
+
+    Removes the empty placeholder and forgets its digest. The version
+    number is not handed out again.
+
+    Args:
+        output_dir: Directory passed to allocate_version()
+        name_format: Filename pattern passed to allocate_version()
+        version: The version it returned
+        digest: The digest it was given
+    """
+    manifest_dir = output_dir / MANIFEST_DIR
+    manifest_path = manifest_dir / f"{name_format}.json"
+
+    with open(manifest_dir / f"{name_format}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        path = output_dir / name_format.format(version=version)
+        try:
+            # Only the placeholder: a completed write is never undone
+            if path.stat().st_size == 0:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+        entry = _read_manifest(manifest_path)
+        digests = entry.get("digests", {})
+        if digest is not None and digests.get(digest) == version:
+            del digests[digest]
+            _write_manifest(manifest_path, entry)
+
+
+@contextmanager
+def atomic_write(path: Path):
+    """
+    Open a text file that replaces path only once it is fully written.
+
+    Args:
+        path: Final location of the file
+
+    Yields:
+        Writable text file object for a temporary file next to path
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+        if tool_metrics.ENABLED:
+            tool_metrics.count("bytes_out", os.path.getsize(tmp_path))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_lines(f, lines) -> None:
+    """Write lines joined by newlines, without building the joined string."""
+    for i, line in enumerate(lines):
+        if i:
+            f.write("\n")
+        f.write(line)
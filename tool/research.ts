@@ -1,4 +1,5 @@
 import { tool } from "@opencode-ai/plugin"
+import { callTool } from "./lib/tool_client"
 
 const TOOL_DIR = `${process.env.HOME}/.config/opencode/tool`
 
@@ -10,10 +11,13 @@ export const google_search = tool({
   description: "Search the web using Google Custom Search API. Returns titles, links, and snippets from search results.",
   args: {
     query: tool.schema.string().describe("The search query string"),
-    num_results: tool.schema.number().optional().describe("Number of results to return (default 10, max 10)")
+    num_results: tool.schema.number().optional().describe("Number of results to return (default 10, max 100)")
   },
   async execute(args) {
     const numResults = args.num_results || 10
+    const served = await callTool("google_search", { query: args.query, num_results: numResults })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
     const result = await Bun.$`python3 ${TOOL_DIR}/google_search.py ${args.query} ${numResults}`.text()
     return result.trim()
   }
@@ -33,11 +37,54 @@ export const save_research = tool({
     metadata: tool.schema.record(tool.schema.string(), tool.schema.any()).optional().describe("Additional metadata as key-value pairs")
   },
   async execute(args) {
-    const sources = JSON.stringify(args.sources || [])
-    const keyFindings = JSON.stringify(args.key_findings || [])
-    const metadata = JSON.stringify(args.metadata || {})
-    
-    const result = await Bun.$`python3 ${TOOL_DIR}/save_research.py ${args.topic} ${args.content} ${sources} ${keyFindings} ${metadata}`.text()
+    const served = await callTool("save_research", {
+      topic: args.topic,
+      content: args.content,
+      sources: args.sources || [],
+      key_findings: args.key_findings || [],
+      metadata: args.metadata || {}
+    })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
+    // Send the report on stdin; large syntheses exceed argv limits
+    const payload = new Response(JSON.stringify({
+      topic: args.topic,
+      content: args.content,
+      sources: args.sources || [],
+      key_findings: args.key_findings || [],
+      metadata: args.metadata || {}
+    }))
+    const result = await Bun.$`python3 ${TOOL_DIR}/save_research.py --input - < ${payload}`.text()
+    return result.trim()
+  }
+})
+
+/**
+ * Search saved research and YouTube queries
+ * Full-text search over research/{topic}/output_v{n}.md and ~/yt-query/*.md
+ */
+export const search_saved = tool({
+  description: "Full-text search over previously saved research reports and YouTube query answers. Returns ranked file paths with matching snippets.",
+  args: {
+    query: tool.schema.string().describe("Words to search for"),
+    limit: tool.schema.number().optional().describe("Maximum number of hits (default 10)"),
+    kind: tool.schema.enum(["research", "yt-query"]).optional().describe("Only search research reports or YouTube queries"),
+    refresh: tool.schema.boolean().optional().describe("Rescan saved files first to pick up edits made outside the tools")
+  },
+  async execute(args) {
+    const limit = args.limit || 10
+    const served = await callTool("search_saved", {
+      query: args.query,
+      limit,
+      kind: args.kind,
+      refresh: args.refresh || false
+    })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
+    const flags = ["--limit", String(limit)]
+    if (args.kind) flags.push("--kind", args.kind)
+    if (args.refresh) flags.push("--refresh")
+    const result = await Bun.$`python3 ${TOOL_DIR}/research_index.py search ${args.query} ${flags}`.text()
     return result.trim()
   }
 })
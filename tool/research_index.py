@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Full-text index over saved research and YouTube query outputs.
+
+Indexes research/<topic>/output_vN.md (written by save_research.py) and
+~/yt-query/<subject>_vN.md (written by save_yt_query.py) in a SQLite FTS5
+table at ~/.cache/opencode/research_index.sqlite3 (override with
+OPENCODE_RESEARCH_INDEX). Both save tools add new files as they write
+them; `update` rescans directories incrementally, re-reading only files
+whose size or mtime changed.
+
+Usage:
+    research_index.py search <query> [--limit N] [--kind research|yt-query]
+                             [--refresh]
+    research_index.py update [DIR ...]
+
+`update` (and `search --refresh`) scan ./research and ~/yt-query by default.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import tool_metrics
+
+INDEX_PATH = Path(
+    os.environ.get(
+        "OPENCODE_RESEARCH_INDEX",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "opencode"
+        / "research_index.sqlite3",
+    )
+)
+
+YT_QUERY_DIR = Path.home() / "yt-query"
+
+# The connection is shared by every thread; writers take turns so one
+# thread's BEGIN (or rollback) never lands inside another's transaction
+_index_lock = threading.RLock()
+
+
+@lru_cache(maxsize=None)
+def get_index() -> sqlite3.Connection:
+    """
+    Open the index, once per process.
+
+    Raises:
+        sqlite3.Error: If the index cannot be opened or FTS5 is unavailable
+    """
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        INDEX_PATH, timeout=10, isolation_level=None, check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+            path UNINDEXED,
+            kind UNINDEXED,
+            topic,
+            query,
+            video_id UNINDEXED,
+            video_url UNINDEXED,
+            created UNINDEXED,
+            body
+        )
+        """
+    )
+    return conn
+
+
+def parse_frontmatter(text: str) -> tuple:
+    """
+    Split YAML-style frontmatter written by the save tools from the body.
+
+    Args:
+        text: Markdown file contents
+
+    Returns:
+        Tuple of (fields dict, body text)
+    """
+    if not text.startswith("---\n"):
+        return {}, text
+    end = text.find("\n---\n", 4)
+    if end == -1:
+        return {}, text
+
+    fields = {}
+    for line in text[4:end].splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        fields[key.strip()] = value
+    return fields, text[end + 5 :]
+
+
+def document_kind(path: Path) -> str:
+    """Classify an output file as research or yt-query."""
+    return "research" if re.fullmatch(r"output_v\d+\.md", path.name) else "yt-query"
+
+
+def index_file(path, stat: os.stat_result = None) -> None:
+    """
+    Add or refresh one saved output in the index.
+
+    Args:
+        path: Markdown file written by save_research or save_yt_query
+        stat: The file's stat result, if already known
+    """
+    path = Path(path).resolve()
+    stat = stat or path.stat()
+    fields, body = parse_frontmatter(path.read_text(encoding="utf-8"))
+
+    conn = get_index()
+    with _index_lock, conn:
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM documents WHERE path = ?", (str(path),))
+        conn.execute(
+            "INSERT INTO documents "
+            "(path, kind, topic, query, video_id, video_url, created, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                str(path),
+                document_kind(path),
+                fields.get("topic", ""),
+                fields.get("query", ""),
+                fields.get("video_id", ""),
+                fields.get("video_url", ""),
+                fields.get("created", ""),
+                body,
+            ),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+            (str(path), stat.st_mtime_ns, stat.st_size),
+        )
+
+
+def remove_file(path: str) -> None:
+    """Drop a file from the index."""
+    conn = get_index()
+    with _index_lock, conn:
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+        conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+
+def default_roots(base_dir: str = None) -> list:
+    """Directories the save tools write to."""
+    return [Path(base_dir or Path.cwd()) / "research", YT_QUERY_DIR]
+
+
+def update_index(roots: list = None) -> dict:
+    """
+    Incrementally index every markdown file under the given directories.
+
+    Args:
+        roots: Directories to scan (default: ./research and ~/yt-query)
+
+    Returns:
+        dict with counts of indexed, unchanged and removed files
+    """
+    roots = roots or default_roots()
+    with _index_lock:
+        return _update_index(get_index(), roots)
+
+
+def _update_index(conn: sqlite3.Connection, roots: list) -> dict:
+    """update_index() body, run with the index lock held."""
+    known = dict(
+        (path, (mtime_ns, size))
+        for path, mtime_ns, size in conn.execute(
+            "SELECT path, mtime_ns, size FROM files"
+        )
+    )
+
+    counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+    for root in roots:
+        root = Path(root).resolve()
+        seen = set()
+        for path in root.rglob("*.md") if root.is_dir() else []:
+            stat = path.stat()
+            seen.add(str(path))
+            if known.get(str(path)) == (stat.st_mtime_ns, stat.st_size):
+                counts["unchanged"] += 1
+                continue
+            index_file(path, stat)
+            counts["indexed"] += 1
+
+        # Forget files under this root that were deleted
+        for path in known:
+            if path.startswith(str(root) + os.sep) and path not in seen:
+                remove_file(path)
+                counts["removed"] += 1
+
+    return counts
+
+
+def _match_expression(query: str, operator: str) -> str:
+    """Quote each word so user input is never parsed as FTS5 syntax."""
+    words = re.findall(r"\w+", query)
+    return f" {operator} ".join(f'"{word}"' for word in words)
+
+
+def search(query: str, limit: int = 10, kind: str = None) -> dict:
+    """
+    Search saved outputs, best matches first.
+
+    All words must match; if nothing does, any word may match.
+
+    Args:
+        query: Free-text query
+        limit: Maximum number of hits
+        kind: Restrict to "research" or "yt-query"
+
+    Returns:
+        dict with ranked hits (path, frontmatter fields, snippet) or error
+    """
+    try:
+        conn = get_index()
+    except sqlite3.Error as e:
+        return {"error": f"Index unavailable: {str(e)}"}
+
+    hits = []
+    for operator in ("AND", "OR"):
+        expression = _match_expression(query, operator)
+        if not expression:
+            break
+        sql = (
+            "SELECT path, kind, topic, query, video_id, video_url, created, "
+            "snippet(documents, 7, '[', ']', ' … ', 16), bm25(documents) "
+            "FROM documents WHERE documents MATCH ?"
+        )
+        params = [expression]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY bm25(documents) LIMIT ?"
+        params.append(limit)
+
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            return {"error": f"Search failed: {str(e)}"}
+
+        hits = [
+            {
+                "path": path,
+                "kind": doc_kind,
+                "topic": topic,
+                "query": doc_query,
+                "video_id": video_id,
+                "video_url": video_url,
+                "created": created,
+                "snippet": " ".join(snippet.split()),
+                "score": round(-score, 4),
+            }
+            for (
+                path,
+                doc_kind,
+                topic,
+                doc_query,
+                video_id,
+                video_url,
+                created,
+                snippet,
+                score,
+            ) in rows
+        ]
+        if hits:
+            break
+
+    return {"query": query, "hits": hits}
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(add_help=False)
+    commands = parser.add_subparsers(dest="command")
+
+    search_parser = commands.add_parser("search", add_help=False)
+    search_parser.add_argument("query", nargs="+")
+    search_parser.add_argument("--limit", type=int, default=10)
+    search_parser.add_argument("--kind", choices=["research", "yt-query"])
+    search_parser.add_argument("--refresh", action="store_true")
+
+    update_parser = commands.add_parser("update", add_help=False)
+    update_parser.add_argument("roots", nargs="*")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    tool_metrics.start("research_index")
+    args = parse_args(sys.argv[1:])
+
+    try:
+        if args.command == "update" or (args.command == "search" and args.refresh):
+            with tool_metrics.span("update"):
+                counts = update_index(getattr(args, "roots", None))
+    except (OSError, sqlite3.Error) as e:
+        print(json.dumps({"error": f"Index update failed: {str(e)}"}, indent=2))
+        sys.exit(1)
+
+    if args.command == "search":
+        with tool_metrics.span("search"):
+            result = search(" ".join(args.query), args.limit, args.kind)
+    elif args.command == "update":
+        result = counts
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -11,6 +11,19 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import tool_metrics
+from output_files import (
+    allocate_version,
+    atomic_write,
+    body_digest,
+    release_version,
+    write_lines,
+)
+from research_index import index_file
+
+# Frontmatter set on every save, ignored when spotting duplicate saves
+STAMPED_KEYS = ("version", "created")
+
 
 def sanitize_topic(topic: str) -> str:
     """Convert topic to a valid folder name using snake_case."""
@@ -20,19 +33,53 @@ def sanitize_topic(topic: str) -> str:
     return sanitized.strip("_")
 
 
-def get_next_version(output_dir: Path) -> int:
-    """Get the next available version number."""
-    if not output_dir.exists():
-        return 1
+def iter_markdown(
+    topic: str,
+    version: int,
+    content: str,
+    sources: list,
+    key_findings: list,
+    metadata: dict,
+):
+    """Yield the lines of a research report, without line endings."""
+    # YAML frontmatter
+    yield "---"
+    yield f'topic: "{topic}"'
+    yield f"version: {version}"
+    yield f'created: "{datetime.now().isoformat()}"'
+    for key, value in metadata.items():
+        if isinstance(value, str):
+            yield f'{key}: "{value}"'
+        else:
+            yield f"{key}: {json.dumps(value)}"
+    yield "---"
+    yield ""
 
-    existing = [f for f in output_dir.iterdir() if f.name.startswith("output_v")]
-    versions = []
-    for f in existing:
-        match = re.search(r"output_v(\d+)\.md", f.name)
-        if match:
-            versions.append(int(match.group(1)))
+    # Title
+    yield f"# {topic}"
+    yield ""
 
-    return max(versions, default=0) + 1
+    # Key findings section
+    if key_findings:
+        yield "## Key Findings"
+        yield ""
+        for finding in key_findings:
+            yield f"- {finding}"
+        yield ""
+
+    # Main content
+    yield "## Research"
+    yield ""
+    yield content
+    yield ""
+
+    # Sources section
+    if sources:
+        yield "## Sources"
+        yield ""
+        for i, source in enumerate(sources, 1):
+            yield f"{i}. {source}"
+        yield ""
 
 
 def save_research(
@@ -41,6 +88,7 @@ def save_research(
     sources: list = None,
     key_findings: list = None,
     metadata: dict = None,
+    base_dir: str = None,
 ) -> dict:
     """
     Save research to markdown file.
@@ -51,9 +99,12 @@ def save_research(
         sources: List of source URLs
         key_findings: List of key findings/bullet points
         metadata: Additional metadata dict
+        base_dir: Directory containing research/ (default: current directory)
 
     Returns:
-        dict with file path and status
+        dict with file path and status; if the same report (ignoring
+        version and timestamps) was already saved for this topic, that
+        file is returned with duplicate set and nothing is written
     """
     sources = sources or []
     key_findings = key_findings or []
@@ -61,77 +112,99 @@ def save_research(
 
     # Create topic folder
     topic_folder = sanitize_topic(topic)
-    research_dir = Path.cwd() / "research" / topic_folder
-    research_dir.mkdir(parents=True, exist_ok=True)
-
-    # Get version number
-    version = get_next_version(research_dir)
-    output_file = research_dir / f"output_v{version}.md"
-
-    # Build markdown content
-    md_lines = []
-
-    # YAML frontmatter
-    md_lines.append("---")
-    md_lines.append(f'topic: "{topic}"')
-    md_lines.append(f"version: {version}")
-    md_lines.append(f'created: "{datetime.now().isoformat()}"')
-    if metadata:
-        for key, value in metadata.items():
-            if isinstance(value, str):
-                md_lines.append(f'{key}: "{value}"')
-            else:
-                md_lines.append(f"{key}: {json.dumps(value)}")
-    md_lines.append("---")
-    md_lines.append("")
-
-    # Title
-    md_lines.append(f"# {topic}")
-    md_lines.append("")
+    research_dir = Path(base_dir or Path.cwd()) / "research" / topic_folder
 
-    # Key findings section
-    if key_findings:
-        md_lines.append("## Key Findings")
-        md_lines.append("")
-        for finding in key_findings:
-            md_lines.append(f"- {finding}")
-        md_lines.append("")
-
-    # Main content
-    md_lines.append("## Research")
-    md_lines.append("")
-    md_lines.append(content)
-    md_lines.append("")
-
-    # Sources section
-    if sources:
-        md_lines.append("## Sources")
-        md_lines.append("")
-        for i, source in enumerate(sources, 1):
-            md_lines.append(f"{i}. {source}")
-        md_lines.append("")
+    # Claim the next version number, unless this exact report is saved
+    with tool_metrics.span("render"):
+        digest = body_digest(
+            iter_markdown(topic, 0, content, sources, key_findings, metadata),
+            STAMPED_KEYS,
+        )
+    with tool_metrics.span("allocate"):
+        version, output_file, duplicate = allocate_version(
+            research_dir, "output_v{version}.md", digest, STAMPED_KEYS
+        )
+    if duplicate:
+        return {
+            "success": True,
+            "file_path": str(output_file),
+            "topic_folder": topic_folder,
+            "version": version,
+            "duplicate": True,
+            "message": f"Identical research already saved to {output_file}",
+        }
 
     # Write file
-    output_file.write_text("\n".join(md_lines), encoding="utf-8")
+    lines = iter_markdown(topic, version, content, sources, key_findings, metadata)
+    try:
+        with tool_metrics.span("write"), atomic_write(output_file) as f:
+            write_lines(f, lines)
+    except BaseException:
+        release_version(research_dir, "output_v{version}.md", version, digest)
+        raise
+
+    # Keep the search index current; a failure here must not lose the save
+    try:
+        with tool_metrics.span("index"):
+            index_file(output_file)
+    except Exception:
+        pass
 
     return {
         "success": True,
         "file_path": str(output_file),
         "topic_folder": topic_folder,
         "version": version,
+        "duplicate": False,
         "message": f"Research saved to {output_file}",
     }
 
 
+USAGE = (
+    "Usage: save_research.py <topic> <content> [sources_json] "
+    "[key_findings_json] [metadata_json]\n"
+    "       save_research.py --input <file|-> "
+    "(JSON object with topic, content, sources, key_findings, metadata)"
+)
+
+
+def read_payload(source: str) -> dict:
+    """
+    Read a JSON save request from a file, /dev/fd/N or stdin ("-").
+
+    Reading from a stream avoids argv size limits for large reports.
+    """
+    if source == "-":
+        payload = json.load(sys.stdin)
+    else:
+        with open(source, encoding="utf-8") as f:
+            payload = json.load(f)
+    if not isinstance(payload, dict) or not {"topic", "content"} <= payload.keys():
+        raise ValueError("input must be a JSON object with topic and content")
+    return payload
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(
-            json.dumps(
-                {
-                    "error": "Usage: save_research.py <topic> <content> [sources_json] [key_findings_json] [metadata_json]"
-                }
-            )
+    tool_metrics.start("save_research")
+    if len(sys.argv) == 3 and sys.argv[1] == "--input":
+        try:
+            with tool_metrics.span("parse"):
+                payload = read_payload(sys.argv[2])
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": f"Invalid input: {str(e)}"}))
+            sys.exit(1)
+        result = save_research(
+            payload["topic"],
+            payload["content"],
+            payload.get("sources"),
+            payload.get("key_findings"),
+            payload.get("metadata"),
         )
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    if len(sys.argv) < 3:
+        print(json.dumps({"error": USAGE}))
         sys.exit(1)
 
     topic = sys.argv[1]
@@ -10,6 +10,19 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import tool_metrics
+from output_files import (
+    allocate_version,
+    atomic_write,
+    body_digest,
+    release_version,
+    write_lines,
+)
+from research_index import index_file
+
+# Frontmatter set on every save, ignored when spotting duplicate saves
+STAMPED_KEYS = ("date", "created")
+
 
 def sanitize_filename(text: str, max_length: int = 50) -> str:
     """Convert text to a valid filename using snake_case."""
@@ -66,21 +79,6 @@ def extract_query_subject(query: str) -> str:
     return sanitize_filename(subject) or "query"
 
 
-def get_next_version(output_dir: Path, base_name: str) -> int:
-    """Get the next available version number for a file."""
-    if not output_dir.exists():
-        return 1
-
-    existing = [f for f in output_dir.iterdir() if f.name.startswith(base_name)]
-    versions = []
-    for f in existing:
-        match = re.search(r"_v(\d+)\.md$", f.name)
-        if match:
-            versions.append(int(match.group(1)))
-
-    return max(versions, default=0) + 1
-
-
 def save_yt_query(
     video_url: str,
     query: str,
@@ -97,16 +95,15 @@ def save_yt_query(
         video_id: Optional video ID for reference
 
     Returns:
-        dict with file path and status
+        dict with file path and status; an identical earlier answer to
+        the same query subject is returned with duplicate set instead
+        of writing a new version
     """
     # Create output directory
     output_dir = Path.home() / "yt-query"
-    output_dir.mkdir(parents=True, exist_ok=True)
 
     # Generate filename from query subject
     query_subject = extract_query_subject(query)
-    version = get_next_version(output_dir, query_subject)
-    output_file = output_dir / f"{query_subject}_v{version}.md"
 
     # Build markdown content
     md_lines = []
@@ -144,19 +141,51 @@ def save_yt_query(
     md_lines.append(answer)
     md_lines.append("")
 
+    # Claim the next version, unless this exact answer is saved
+    with tool_metrics.span("render"):
+        digest = body_digest(md_lines, STAMPED_KEYS)
+    name_format = f"{query_subject}_v{{version}}.md"
+    with tool_metrics.span("allocate"):
+        version, output_file, duplicate = allocate_version(
+            output_dir, name_format, digest, STAMPED_KEYS
+        )
+    if duplicate:
+        return {
+            "success": True,
+            "file_path": str(output_file),
+            "filename": output_file.name,
+            "version": version,
+            "duplicate": True,
+            "message": f"Identical answer already saved to {output_file}",
+        }
+
     # Write file
-    output_file.write_text("\n".join(md_lines), encoding="utf-8")
+    try:
+        with tool_metrics.span("write"), atomic_write(output_file) as f:
+            write_lines(f, md_lines)
+    except BaseException:
+        release_version(output_dir, name_format, version, digest)
+        raise
+
+    # Keep the search index current; a failure here must not lose the save
+    try:
+        with tool_metrics.span("index"):
+            index_file(output_file)
+    except Exception:
+        pass
 
     return {
         "success": True,
         "file_path": str(output_file),
         "filename": output_file.name,
         "version": version,
+        "duplicate": False,
         "message": f"Saved to {output_file}",
     }
 
 
 if __name__ == "__main__":
+    tool_metrics.start("save_yt_query")
     if len(sys.argv) < 4:
         print(
             json.dumps(
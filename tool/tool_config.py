@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Shared configuration for OpenCode tools.
+
+Reads the first .env file found in:
+    ~/.config/ai-workflows/.env
+    ~/ai-workflow/.env
+    ./.env
+
+Values from the .env file take precedence over the process environment
+(matching the old load_env() behaviour), but os.environ is never
+modified. The ENV_ONLY endpoint overrides are read from the process
+environment alone: a .env checked into a project must not be able to
+send the API key or YouTube traffic to another host. The parsed result is cached and only re-read when the chosen
+file's mtime or size changes, so get_settings() is cheap on hot paths.
+
+Usage:
+    from tool_config import get_settings
+
+    settings = get_settings()
+    settings.google_api_key
+
+venv_site_packages() resolves the OpenCode venv's site-packages for the
+running interpreter and caches the answer in
+~/.cache/opencode/site_packages.json, so tools skip the directory scan on
+every start.
+"""
+
+import json
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+
+import tool_metrics
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed view of tool configuration."""
+
+    # google_search
+    google_api_key: str = ""
+    google_cse_id: str = ""
+    google_search_cache_ttl: float = 3600.0
+    google_search_cache_size: int = 1000
+    google_search_cache_stale: float = 0.0
+    google_search_rate: float = 10.0
+    google_search_retries: int = 3
+    google_search_batch_workers: int = 4
+    google_search_endpoint: str = "https://www.googleapis.com/customsearch/v1"
+
+    # warmup_ollama
+    ollama_host: str = "http://localhost:11434"
+    ollama_model: str = "qwen3:30b"
+    ollama_keepalive: str = "60m"
+    ollama_models: str = ""
+    ollama_memory_budget_gb: float = 0.0
+    ollama_renew_seconds: float = 300.0
+
+    # yt_transcript
+    opencode_venv: Path = Path.home() / ".config" / "opencode" / ".venv"
+    yt_transcript_cache_mb: int = 256
+    yt_transcript_rate: float = 5.0
+    yt_transcript_workers: int = 4
+    yt_transcript_endpoint: str = ""
+
+    # Where the values came from, and every raw key for ad-hoc lookups
+    env_file: Path | None = None
+    values: dict = field(default_factory=dict, repr=False)
+
+    def get(self, key: str, default: str = None) -> str | None:
+        """Look up a raw configuration value by its .env/environment name."""
+        return self.values.get(key, default)
+
+
+# Settings field -> environment variable
+_FIELDS = {
+    "google_api_key": "GOOGLE_API_KEY",
+    "google_cse_id": "GOOGLE_CSE_ID",
+    "google_search_cache_ttl": "GOOGLE_SEARCH_CACHE_TTL",
+    "google_search_cache_size": "GOOGLE_SEARCH_CACHE_SIZE",
+    "google_search_cache_stale": "GOOGLE_SEARCH_CACHE_STALE",
+    "google_search_rate": "GOOGLE_SEARCH_RATE",
+    "google_search_retries": "GOOGLE_SEARCH_RETRIES",
+    "google_search_batch_workers": "GOOGLE_SEARCH_BATCH_WORKERS",
+    "google_search_endpoint": "GOOGLE_SEARCH_ENDPOINT",
+    "ollama_host": "OLLAMA_HOST",
+    "ollama_model": "OLLAMA_MODEL",
+    "ollama_keepalive": "OLLAMA_KEEPALIVE",
+    "ollama_models": "OLLAMA_MODELS",
+    "ollama_memory_budget_gb": "OLLAMA_MEMORY_BUDGET_GB",
+    "ollama_renew_seconds": "OLLAMA_RENEW_SECONDS",
+    "opencode_venv": "OPENCODE_VENV",
+    "yt_transcript_cache_mb": "YT_TRANSCRIPT_CACHE_MB",
+    "yt_transcript_rate": "YT_TRANSCRIPT_RATE",
+    "yt_transcript_workers": "YT_TRANSCRIPT_WORKERS",
+    "yt_transcript_endpoint": "YT_TRANSCRIPT_ENDPOINT",
+}
+
+# Endpoint overrides ignored in .env files (for offline stand-ins only)
+ENV_ONLY = frozenset({"GOOGLE_SEARCH_ENDPOINT", "YT_TRANSCRIPT_ENDPOINT"})
+
+SITE_PACKAGES_CACHE = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "opencode"
+    / "site_packages.json"
+)
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def env_paths(cwd: str = None) -> list:
+    """Candidate .env files, in priority order."""
+    return [
+        Path.home() / ".config" / "ai-workflows" / ".env",
+        Path.home() / "ai-workflow" / ".env",
+        Path(cwd or Path.cwd()) / ".env",
+    ]
+
+
+def parse_env_file(path: Path) -> dict:
+    """
+    Parse KEY=VALUE lines, ignoring blanks and comments.
+
+    Args:
+        path: .env file to read
+
+    Returns:
+        dict of raw string values
+    """
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def _coerce(default, raw: str):
+    """Convert a raw string to the type of a field's default."""
+    try:
+        if isinstance(default, Path):
+            return Path(raw).expanduser()
+        return type(default)(raw)
+    except ValueError:
+        return default
+
+
+def build_settings(values: dict, env_file: Path = None) -> Settings:
+    """
+    Build Settings from raw configuration values.
+
+    Args:
+        values: Raw values keyed by environment variable name
+        env_file: The .env file the values were read from, if any
+
+    Returns:
+        Settings with unparseable values left at their defaults
+    """
+    defaults = Settings()
+    typed = {
+        name: _coerce(getattr(defaults, name), values[key])
+        for name, key in _FIELDS.items()
+        if values.get(key, "") != ""
+    }
+    return Settings(**typed, env_file=env_file, values=values)
+
+
+def get_settings(cwd: str = None) -> Settings:
+    """
+    Return the current settings, re-reading .env only when it changed.
+
+    Args:
+        cwd: Directory whose .env is the last candidate (default: cwd)
+
+    Returns:
+        Settings
+    """
+    with tool_metrics.span("env"):
+        return _load_settings(cwd)
+
+
+def _load_settings(cwd: str = None) -> Settings:
+    env_file = None
+    stamp = None
+    for path in env_paths(cwd):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        env_file = path
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        break
+
+    key = (env_file, stamp)
+    with _lock:
+        cached = _cache.get(cwd)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    values = dict(os.environ)
+    if env_file is not None:
+        try:
+            parsed = parse_env_file(env_file)
+            values.update((k, v) for k, v in parsed.items() if k not in ENV_ONLY)
+        except OSError:
+            pass
+    settings = build_settings(values, env_file)
+    if "://" not in settings.ollama_host:
+        # Ollama also accepts OLLAMA_HOST as a bare host:port
+        settings = replace(settings, ollama_host=f"http://{settings.ollama_host}")
+
+    with _lock:
+        _cache[cwd] = (key, settings)
+    return settings
+
+
+def _scan_site_packages(lib: Path) -> list:
+    # Prefer the running Python's version; other versions' compiled
+    # extensions would not load anyway
+    own = lib / f"python{sys.version_info[0]}.{sys.version_info[1]}" / "site-packages"
+    if own.is_dir():
+        return [str(own)]
+    return [str(p) for p in lib.glob("python*/site-packages")]
+
+
+def venv_site_packages(venv: Path) -> list:
+    """
+    site-packages directories of a venv, for adding to sys.path.
+
+    The result is cached per venv and interpreter version and re-resolved
+    only when the venv's lib directory changes (e.g. it is recreated).
+
+    Args:
+        venv: Virtual environment root
+
+    Returns:
+        Directory paths, most preferred first; [] if the venv is missing
+    """
+    lib = Path(venv) / "lib"
+    try:
+        stamp = lib.stat().st_mtime_ns
+    except OSError:
+        return []
+
+    key = f"{lib}:{sys.version_info[0]}.{sys.version_info[1]}"
+    try:
+        with open(SITE_PACKAGES_CACHE) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    if not isinstance(cached, dict):
+        cached = {}
+    entry = cached.get(key)
+    if isinstance(entry, dict) and entry.get("mtime_ns") == stamp:
+        return entry.get("paths", [])
+
+    paths = _scan_site_packages(lib)
+    cached[key] = {"mtime_ns": stamp, "paths": paths}
+    try:
+        SITE_PACKAGES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = SITE_PACKAGES_CACHE.with_name(
+            f"{SITE_PACKAGES_CACHE.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_path, "w") as f:
+            json.dump(cached, f)
+        os.replace(tmp_path, SITE_PACKAGES_CACHE)
+    except OSError:
+        pass
+    return paths
+
+
+if __name__ == "__main__":
+    # Print the resolved settings without secrets
+    resolved = asdict(get_settings())
+    resolved.pop("values")
+    for secret in ("google_api_key",):
+        if resolved[secret]:
+            resolved[secret] = "***"
+    print(json.dumps(resolved, indent=2, default=str))
+    sys.exit(0)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Opt-in timing and counters for the tools' hot paths.
+
+Set OPENCODE_METRICS=1 to append one NDJSON record per tool invocation to
+~/.cache/opencode/metrics.ndjson, or set it to a file path to write
+there instead. It is read from the process environment only, not .env,
+so that loading .env itself can be timed. When unset, span() and count()
+do nothing.
+
+Each record holds the total wall time and the summed time spent in named
+phases ("spans"), such as startup (interpreter start to the first tool
+import), import, env, connect, network, parse, cache and write, plus counters
+like bytes_in, bytes_out, cache_hits and cache_misses:
+
+    {"ts": "...", "tool": "google_search", "mode": "cli", "pid": 4242,
+     "total_ms": 412.7, "spans": {"startup": 31.0, "network": 301.2, ...},
+     "counts": {"bytes_in": 18233, "cache_misses": 1}}
+
+Spans run on worker threads are summed, so with concurrent requests a
+phase can exceed total_ms. A command line run is one invocation, written
+at exit; under tool_server.py each request is one invocation.
+
+Usage:
+    tool_metrics.py summary [--file PATH] [--tool NAME] [--last N] [--json]
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+IMPORTED_AT = time.perf_counter()
+
+_setting = os.environ.get("OPENCODE_METRICS", "")
+ENABLED = _setting.lower() not in ("", "0", "false", "no", "off")
+METRICS_PATH = Path(
+    _setting
+    if ENABLED and _setting.lower() not in ("1", "true", "yes", "on")
+    else Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "opencode"
+    / "metrics.ndjson"
+)
+
+_NO_SPAN = nullcontext()
+_local = threading.local()
+_process = None
+
+
+def _process_age() -> float | None:
+    """Seconds since this process started (Linux only, ~10 ms resolution)."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Recorder:
+    """Span durations and counters for one invocation."""
+
+    def __init__(self, tool: str, mode: str, started: float = None):
+        self.tool = tool
+        self.mode = mode
+        self.started = time.perf_counter() if started is None else started
+        self.spans = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, n: int) -> None:
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def record(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now))
+                + f".{int(now % 1 * 1000):03d}Z",
+                "tool": self.tool,
+                "mode": self.mode,
+                "pid": os.getpid(),
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "spans": {
+                    name: round(seconds * 1000, 3)
+                    for name, seconds in self.spans.items()
+                },
+                "counts": dict(self.counts),
+            }
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder: Recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add_span(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _current() -> Recorder | None:
+    return getattr(_local, "recorder", None) or _process
+
+
+def span(name: str):
+    """
+    Time a block as the named phase of the current invocation.
+
+    Usage:
+        with tool_metrics.span("network"):
+            ...
+    """
+    if not ENABLED:
+        return _NO_SPAN
+    recorder = _current()
+    return _Span(recorder, name) if recorder is not None else _NO_SPAN
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a counter of the current invocation (e.g. bytes_in)."""
+    if not ENABLED:
+        return
+    recorder = _current()
+    if recorder is not None:
+        recorder.add_count(name, n)
+
+
+def wrap(fn):
+    """Make fn record into the caller's invocation when run on another thread."""
+    if not ENABLED:
+        return fn
+    recorder = _current()
+
+    def run(*args, **kwargs):
+        previous = getattr(_local, "recorder", None)
+        _local.recorder = recorder
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.recorder = previous
+
+    return run
+
+
+def write_record(record: dict) -> None:
+    """Append one record; metrics must never make a tool fail."""
+    line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+    try:
+        METRICS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(METRICS_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def start(tool: str) -> None:
+    """
+    Begin recording a command line run, written when the process exits.
+
+    Call once from a tool's __main__ block, after its imports: the time
+    from interpreter start to the first tool import is recorded as the
+    startup span and the rest of the imports as the import span.
+    """
+    global _process
+    if not ENABLED or _process is not None:
+        return
+    age = _process_age()
+    now = time.perf_counter()
+    started = now - age if age is not None and age > now - IMPORTED_AT else IMPORTED_AT
+    _process = Recorder(tool, "cli", started)
+    _process.add_span("startup", max(0.0, IMPORTED_AT - started))
+    _process.add_span("import", now - IMPORTED_AT)
+    atexit.register(lambda: write_record(_process.record()))
+
+
+@contextmanager
+def invocation(tool: str):
+    """Record everything in the block, on this thread, as one invocation."""
+    if not ENABLED:
+        yield
+        return
+    recorder = Recorder(tool, "server")
+    previous = getattr(_local, "recorder", None)
+    _local.recorder = recorder
+    try:
+        yield
+    finally:
+        _local.recorder = previous
+        write_record(recorder.record())
+
+
+def read_records(path: Path = None) -> list:
+    """Parse a metrics file, skipping damaged lines."""
+    records = []
+    try:
+        with open(path or METRICS_PATH, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "tool" in record:
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(records: list) -> dict:
+    """
+    p50/p95 per tool and phase.
+
+    Args:
+        records: Records as written by write_record()
+
+    Returns:
+        dict of tool -> {"invocations", "phases": {phase: {n, p50_ms,
+        p95_ms}}, "counts": {name: total}}; the "total" phase is the
+        whole invocation
+    """
+    by_tool = {}
+    for record in records:
+        by_tool.setdefault(record["tool"], []).append(record)
+
+    summary = {}
+    for tool, tool_records in sorted(by_tool.items()):
+        phases = {"total": [r.get("total_ms", 0.0) for r in tool_records]}
+        counts = {}
+        for record in tool_records:
+            for name, ms in record.get("spans", {}).items():
+                phases.setdefault(name, []).append(ms)
+            for name, n in record.get("counts", {}).items():
+                counts[name] = counts.get(name, 0) + n
+
+        summary[tool] = {
+            "invocations": len(tool_records),
+            "phases": {
+                name: {
+                    "n": len(values),
+                    "p50_ms": round(_percentile(values, 50), 2),
+                    "p95_ms": round(_percentile(values, 95), 2),
+                }
+                for name, values in phases.items()
+            },
+            "counts": counts,
+        }
+    return summary
+
+
+def format_summary(summary: dict) -> str:
+    """Render a summary as a plain-text table."""
+    lines = [f"{'tool / phase':<32} {'n':>6} {'p50 ms':>10} {'p95 ms':>10}"]
+    for tool, data in summary.items():
+        lines.append(f"{tool} ({data['invocations']} runs)")
+        for name, stats in data["phases"].items():
+            lines.append(
+                f"  {name:<30} {stats['n']:>6} "
+                f"{stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f}"
+            )
+        for name, total in sorted(data["counts"].items()):
+            lines.append(f"  {name:<30} {total:>6} total")
+    return "\n".join(lines)
+
+
+def parse_args(argv: list) -> "argparse.Namespace":
+    """Parse command-line arguments."""
+    # Imported here: every tool imports this module on its startup path
+    import argparse
+
+    parser = argparse.ArgumentParser(add_help=False)
+    commands = parser.add_subparsers(dest="command")
+
+    summary_parser = commands.add_parser("summary", add_help=False)
+    summary_parser.add_argument("--file", type=Path)
+    summary_parser.add_argument("--tool")
+    summary_parser.add_argument("--last", type=int)
+    summary_parser.add_argument("--json", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.command != "summary":
+        print(__doc__)
+        sys.exit(1)
+
+    records = read_records(args.file)
+    if args.tool:
+        records = [r for r in records if r["tool"] == args.tool]
+    if args.last:
+        records = records[-args.last :]
+
+    summary = summarize(records)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    elif summary:
+        print(format_summary(summary))
+    else:
+        print(f"No metrics recorded in {args.file or METRICS_PATH}")
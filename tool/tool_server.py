@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Persistent tool server for OpenCode tools.
+
+Keeps one warm Python process so tool calls skip interpreter startup,
+heavy imports (tiktoken, youtube_transcript_api) and repeated setup.
+Speaks newline-delimited JSON-RPC 2.0 over a Unix socket or stdio.
+
+Usage:
+    python3 tool/tool_server.py            # serve on the Unix socket
+    python3 tool/tool_server.py --stdio    # serve on stdin/stdout
+
+Request (one JSON object per line):
+    {"jsonrpc": "2.0", "id": 1, "method": "google_search",
+     "params": {"query": "bun sqlite", "num_results": 5}, "cwd": "/project"}
+
+Methods:
+    google_search, get_transcript, get_transcripts, save_research, save_yt_query,
+    search_saved, warmup_model, warm_pool, count_tokens, budget_tokens, ping,
+    shutdown
+
+The socket lives at $OPENCODE_TOOL_SOCKET, defaulting to
+$XDG_RUNTIME_DIR/opencode-tools.sock, or without XDG_RUNTIME_DIR to
+/tmp/opencode-tools-<uid>/tools.sock in a directory only this user can
+enter (the server refuses to start if someone else owns it).
+The server exits after OPENCODE_TOOL_IDLE_SECONDS (default 1800) without
+requests.
+
+With OPENCODE_METRICS set, each request is recorded as one invocation
+(see tool_metrics.py).
+"""
+
+import importlib
+import inspect
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+
+TOOL_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOL_DIR))
+
+import tool_metrics
+
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR")
+# Shared /tmp is only used through a directory private to this user
+PRIVATE_DIR = f"/tmp/opencode-tools-{os.getuid()}"
+SOCKET_PATH = os.environ.get(
+    "OPENCODE_TOOL_SOCKET",
+    (
+        f"{RUNTIME_DIR}/opencode-tools.sock"
+        if RUNTIME_DIR
+        else f"{PRIVATE_DIR}/tools.sock"
+    ),
+)
+IDLE_SECONDS = float(os.environ.get("OPENCODE_TOOL_IDLE_SECONDS", "1800"))
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+_started = time.monotonic()
+_last_request = _started
+_shutdown = threading.Event()
+
+
+def _tool(module_name: str, function_name: str):
+    """Import a tool module on first use and return one of its functions."""
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _resolve(cwd: str | None, path: str) -> str:
+    """Resolve a client-relative path against the client's working directory."""
+    if cwd and not os.path.isabs(path):
+        return os.path.join(cwd, path)
+    return path
+
+
+def call_google_search(cwd, query: str, num_results: int = 10) -> dict:
+    return _tool("google_search", "google_search")(query, num_results, cwd=cwd)
+
+
+def call_get_transcript(
+    cwd,
+    url: str,
+    languages: list = None,
+    prefetch: bool = False,
+    time_from: str = None,
+    time_to: str = None,
+    segments: bool = False,
+    chunk_tokens: int = None,
+    chunk_overlap: int = 0,
+    chunk_index: int = None,
+    query: str = None,
+    top_k: int = 5,
+    max_tokens: int = None,
+) -> dict:
+    parse_timestamp = _tool("yt_transcript", "parse_timestamp")
+    return _tool("yt_transcript", "get_transcript")(
+        url,
+        languages=languages,
+        prefetch=prefetch,
+        time_from=None if time_from is None else parse_timestamp(time_from),
+        time_to=None if time_to is None else parse_timestamp(time_to),
+        include_segments=segments,
+        chunk_tokens=chunk_tokens,
+        chunk_overlap=chunk_overlap,
+        chunk_index=chunk_index,
+        query=query,
+        top_k=top_k,
+        max_tokens=max_tokens,
+    )
+
+
+def call_get_transcripts(
+    cwd, urls: list, languages: list = None, prefetch: bool = False
+) -> dict:
+    get_transcripts = _tool("yt_transcript", "get_transcripts")
+    results = get_transcripts(urls, languages=languages, prefetch=prefetch)
+    return {"results": list(results)}
+
+
+def call_save_research(
+    cwd,
+    topic: str,
+    content: str,
+    sources: list = None,
+    key_findings: list = None,
+    metadata: dict = None,
+) -> dict:
+    return _tool("save_research", "save_research")(
+        topic, content, sources, key_findings, metadata, base_dir=cwd
+    )
+
+
+def call_save_yt_query(
+    cwd, video_url: str, query: str, answer: str, video_id: str = None
+) -> dict:
+    # Same escaped-newline handling as the save_yt_query.py CLI
+    answer = answer.replace("\\n", "\n")
+    return _tool("save_yt_query", "save_yt_query")(video_url, query, answer, video_id)
+
+
+def call_search_saved(
+    cwd, query: str, limit: int = 10, kind: str = None, refresh: bool = False
+) -> dict:
+    if refresh:
+        roots = _tool("research_index", "default_roots")(cwd)
+        _tool("research_index", "update_index")(roots)
+    return _tool("research_index", "search")(query, limit, kind)
+
+
+def call_warmup_model(cwd, model: str = None, keepalive: str = None) -> dict:
+    return _tool("warmup_ollama", "warmup_model")(model, keepalive)
+
+
+def call_warm_pool(
+    cwd, models: list = None, keepalive: str = None, budget_gb: float = None
+) -> dict:
+    return _tool("warmup_ollama", "warm_pool")(models, keepalive, budget_gb)
+
+
+def call_count_tokens(
+    cwd, files: list = None, texts: list = None, use_cache: bool = True
+) -> dict:
+    """Count tokens for files (paths relative to cwd) and/or raw texts."""
+    result = {}
+    if files is not None:
+        count_files_tokens = _tool("count_tokens", "count_files_tokens")
+        paths = [_resolve(cwd, f) for f in files]
+        results = count_files_tokens(paths, use_cache=use_cache)
+        # Report paths the way the client passed them
+        for original, r in zip(files, results):
+            r["file"] = original
+        result["files"] = results
+    if texts is not None:
+        budget_texts = _tool("count_tokens", "budget_texts")
+        result["texts"] = [r["tokens"] for r in budget_texts(texts)]
+    return result
+
+
+def call_budget_tokens(cwd, texts: list, max_tokens=None) -> dict:
+    """Exact counts for texts, truncating any over max_tokens."""
+    try:
+        return {"texts": _tool("count_tokens", "budget_texts")(texts, max_tokens)}
+    except ValueError as e:
+        return {"error": f"Invalid texts input: {str(e)}"}
+
+
+def call_ping(cwd) -> dict:
+    return {"pid": os.getpid(), "uptime": time.monotonic() - _started}
+
+
+def call_shutdown(cwd) -> dict:
+    _shutdown.set()
+    return {"success": True}
+
+
+METHODS = {
+    "google_search": call_google_search,
+    "get_transcript": call_get_transcript,
+    "get_transcripts": call_get_transcripts,
+    "save_research": call_save_research,
+    "save_yt_query": call_save_yt_query,
+    "search_saved": call_search_saved,
+    "warmup_model": call_warmup_model,
+    "warm_pool": call_warm_pool,
+    "count_tokens": call_count_tokens,
+    "budget_tokens": call_budget_tokens,
+    "ping": call_ping,
+    "shutdown": call_shutdown,
+}
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+def handle_request(line: str) -> dict | None:
+    """
+    Dispatch one JSON-RPC request line.
+
+    Args:
+        line: Raw request line
+
+    Returns:
+        Response dict, or None for notifications (requests without an id)
+    """
+    global _last_request
+    _last_request = time.monotonic()
+
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return _error(None, PARSE_ERROR, f"Parse error: {str(e)}")
+
+    if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+        return _error(None, INVALID_REQUEST, "Invalid request")
+
+    request_id = request.get("id")
+    method = METHODS.get(request["method"])
+    if method is None:
+        return _error(
+            request_id, METHOD_NOT_FOUND, f"Unknown method: {request['method']}"
+        )
+
+    params = request.get("params") or {}
+    if not isinstance(params, dict):
+        return _error(request_id, INVALID_PARAMS, "params must be an object")
+
+    try:
+        bound = inspect.signature(method).bind(request.get("cwd"), **params)
+    except TypeError as e:
+        return _error(request_id, INVALID_PARAMS, f"Invalid params: {str(e)}")
+
+    try:
+        with tool_metrics.invocation(request["method"]):
+            result = method(*bound.args, **bound.kwargs)
+    except Exception as e:
+        return _error(request_id, INTERNAL_ERROR, f"Unexpected error: {str(e)}")
+
+    if request_id is None:
+        return None
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+class ToolRequestHandler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited requests on one client connection."""
+
+    def handle(self):
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            response = handle_request(raw.decode("utf-8"))
+            if response is not None:
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+
+class ToolServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def socket_in_use(path: str) -> bool:
+    """Check whether a live server is already listening on path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+def private_dir_error(path: str) -> str | None:
+    """Create a 0700 directory, or say why an existing one is not private."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        return f"Cannot create {path}: {e}"
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return f"{path} is not a directory private to this user"
+    return None
+
+
+def serve_socket(path: str = SOCKET_PATH) -> None:
+    """Serve on a Unix socket until idle for IDLE_SECONDS or shut down."""
+    if os.path.dirname(path) == PRIVATE_DIR:
+        error = private_dir_error(PRIVATE_DIR)
+        if error:
+            print(json.dumps({"error": error}))
+            return
+
+    if socket_in_use(path):
+        print(json.dumps({"error": f"Tool server already running on {path}"}))
+        return
+
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    old_umask = os.umask(0o177)
+    try:
+        server = ToolServer(path, ToolRequestHandler)
+    finally:
+        os.umask(old_umask)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        while not _shutdown.wait(timeout=5):
+            if time.monotonic() - _last_request > IDLE_SECONDS:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def serve_stdio() -> None:
+    """Serve requests from stdin, writing responses to stdout."""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response = handle_request(line)
+        if response is not None:
+            sys.stdout.write(json.dumps(response) + "\n")
+            sys.stdout.flush()
+        if _shutdown.is_set():
+            break
+
+
+if __name__ == "__main__":
+    if "--stdio" in sys.argv[1:]:
+        serve_stdio()
+    else:
+        serve_socket()
@@ -1,71 +1,502 @@
 #!/usr/bin/env python3
 """
-Warm up Ollama model to reduce cold start latency.
-Sends a minimal request to load the model into memory.
+Warm up Ollama models to reduce cold start latency.
+
+Checks which models are already loaded (/api/ps) and only loads the ones
+that are not, or whose keep_alive is about to run out. A warm pool of
+several models (OLLAMA_MODELS) is loaded concurrently, skipping models
+that would push loaded memory past OLLAMA_MEMORY_BUDGET_GB.
+
+Usage:
+    warmup_ollama.py [model] [keepalive]
+    warmup_ollama.py --pool [model ...] [--keepalive 60m] [--budget-gb N]
+                     [--watch]
+
+    warmup_ollama.py --bench [model ...] [--prompts FILE] [--concurrency 1,4]
+                     [--repeat N] [--num-predict N] [--cold]
+
+--watch keeps running and renews keep_alive before the models expire.
+
+--bench streams each prompt through /api/generate and reports, per model
+and concurrency level, p50/p95 time to first token, tokens/sec and
+Ollama's load/prompt-eval durations as JSON. --cold unloads the model
+before each level so the first request includes the load. Point
+OLLAMA_HOST at a stand-in server to benchmark offline.
 """
 
+import argparse
 import json
 import sys
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+import time
+from datetime import datetime, timezone
+
+import tool_metrics
+from tool_config import get_settings
+
+LOAD_TIMEOUT = 120
+STATUS_TIMEOUT = 5
+
+
+def _request(path: str, payload: dict = None) -> "urllib.request.Request":
+    # Deferred, like the thread pools below, to keep startup to the minimum
+    from urllib.request import Request
+
+    url = f"{get_settings().ollama_host.rstrip('/')}{path}"
+    if payload is None:
+        return Request(url, method="GET")
+    return Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+
+
+def _api(path: str, payload: dict = None, timeout: float = STATUS_TIMEOUT) -> dict:
+    """
+    Call the Ollama HTTP API.
+
+    Raises:
+        HTTPError, URLError: On request failure
+    """
+    from urllib.request import urlopen
+
+    request = _request(path, payload)
+    with tool_metrics.span("network"):
+        with urlopen(request, timeout=timeout) as response:
+            body = response.read()
+    tool_metrics.count("bytes_out", len(request.data or b""))
+    tool_metrics.count("bytes_in", len(body))
+    with tool_metrics.span("parse"):
+        return json.loads(body.decode())
+
+
+def _error(e: Exception) -> str:
+    from urllib.error import HTTPError, URLError
+
+    if isinstance(e, HTTPError):
+        return f"HTTP Error {e.code}: {e.reason}"
+    if isinstance(e, URLError):
+        return f"URL Error: {e.reason} - Is Ollama running?"
+    return f"Unexpected error: {str(e)}"
+
+
+def _canonical(model: str) -> str:
+    """Ollama reports untagged models as name:latest."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def _seconds_left(expires_at: str) -> float:
+    """Seconds until a loaded model's keep_alive expires (0 if unknown)."""
+    try:
+        expires = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return 0.0
+    return (expires - datetime.now(timezone.utc)).total_seconds()
+
+
+def loaded_models() -> dict:
+    """
+    Models currently in memory.
 
+    Returns:
+        dict of model name -> {"size": bytes, "seconds_left": float}
+
+    Raises:
+        HTTPError, URLError: If Ollama cannot be reached
+    """
+    loaded = {}
+    for entry in _api("/api/ps").get("models", []):
+        loaded[entry["name"]] = {
+            "size": entry.get("size", 0),
+            "seconds_left": _seconds_left(entry.get("expires_at")),
+        }
+    return loaded
+
+
+def model_sizes() -> dict:
+    """
+    Size of each locally available model, used to estimate its memory.
 
-def warmup_model(model: str = "qwen3:30b", keepalive: str = "60m") -> dict:
+    Raises:
+        HTTPError, URLError: If Ollama cannot be reached
     """
-    Send a minimal request to Ollama to load the model into memory.
+    return {
+        entry["name"]: entry.get("size", 0)
+        for entry in _api("/api/tags").get("models", [])
+    }
+
+
+def _load(model: str, keepalive: str) -> None:
+    # A generate request without a prompt only loads the model and sets
+    # its keep_alive; on a resident model it just renews keep_alive
+    _api(
+        "/api/generate",
+        {"model": model, "keep_alive": keepalive},
+        timeout=LOAD_TIMEOUT,
+    )
+
+
+def warmup_model(model: str = None, keepalive: str = None) -> dict:
+    """
+    Load a model into memory unless it is already loaded.
 
     Args:
-        model: Model name to warm up
-        keepalive: How long to keep model in memory (e.g., "60m", "2h")
+        model: Model name to warm up (default: OLLAMA_MODEL or qwen3:30b)
+        keepalive: How long to keep model in memory (e.g., "60m", "2h";
+            default: OLLAMA_KEEPALIVE or 60m)
 
     Returns:
         dict with status
     """
-    url = "http://localhost:11434/api/generate"
-
-    payload = json.dumps(
-        {
-            "model": model,
-            "prompt": "hi",
-            "stream": False,
-            "keep_alive": keepalive,
-            "options": {
-                "num_predict": 1  # Generate minimal tokens
-            },
-        }
-    ).encode("utf-8")
+    settings = get_settings()
+    model = model or settings.ollama_model
+    keepalive = keepalive or settings.ollama_keepalive
 
     try:
-        req = Request(
-            url,
-            data=payload,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-
-        with urlopen(req, timeout=120) as response:
-            data = json.loads(response.read().decode())
+        # A failed status check is not fatal; just load the model
+        try:
+            resident = loaded_models().get(_canonical(model))
+        except Exception:
+            resident = None
+        if resident and resident["seconds_left"] > settings.ollama_renew_seconds:
             return {
                 "success": True,
                 "model": model,
                 "keepalive": keepalive,
-                "message": f"Model {model} is now warm and will stay loaded for {keepalive}",
+                "already_loaded": True,
+                "message": f"Model {model} is already warm",
             }
 
-    except HTTPError as e:
-        return {"success": False, "error": f"HTTP Error {e.code}: {e.reason}"}
-    except URLError as e:
+        _load(model, keepalive)
         return {
-            "success": False,
-            "error": f"URL Error: {e.reason} - Is Ollama running?",
+            "success": True,
+            "model": model,
+            "keepalive": keepalive,
+            "already_loaded": resident is not None,
+            "message": f"Model {model} is now warm and will stay loaded for {keepalive}",
         }
+
     except Exception as e:
-        return {"success": False, "error": f"Unexpected error: {str(e)}"}
+        return {"success": False, "error": _error(e)}
+
+
+def warm_pool(
+    models: list = None, keepalive: str = None, budget_gb: float = None
+) -> dict:
+    """
+    Keep a set of models loaded, within a memory budget.
+
+    Models are considered in order. Resident models with enough
+    keep_alive left are skipped; ones close to expiry are renewed; the
+    rest are loaded concurrently as long as the total size of loaded
+    models stays within the budget.
+
+    Args:
+        models: Model names (default: OLLAMA_MODELS, else OLLAMA_MODEL)
+        keepalive: keep_alive for loaded models (default: OLLAMA_KEEPALIVE)
+        budget_gb: Memory budget in GB, 0 for unlimited
+            (default: OLLAMA_MEMORY_BUDGET_GB)
+
+    Returns:
+        dict with a status per model, or error
+    """
+    settings = get_settings()
+    if not models:
+        models = [m.strip() for m in settings.ollama_models.split(",") if m.strip()]
+        models = models or [settings.ollama_model]
+    keepalive = keepalive or settings.ollama_keepalive
+    if budget_gb is None:
+        budget_gb = settings.ollama_memory_budget_gb
+    budget = budget_gb * 1024**3
+
+    try:
+        loaded = loaded_models()
+        sizes = model_sizes()
+    except Exception as e:
+        return {"success": False, "error": _error(e)}
+
+    used = sum(entry["size"] for entry in loaded.values())
+    results = {}
+    to_load = []
+    for model in dict.fromkeys(models):
+        resident = loaded.get(_canonical(model))
+        if resident:
+            if resident["seconds_left"] > settings.ollama_renew_seconds:
+                results[model] = {"status": "loaded"}
+            else:
+                to_load.append((model, "renewed"))
+            continue
+
+        size = sizes.get(_canonical(model))
+        if size is None:
+            results[model] = {"status": "error", "error": "Model not pulled"}
+        elif budget and used + size > budget:
+            results[model] = {"status": "skipped", "error": "Over memory budget"}
+        else:
+            used += size
+            to_load.append((model, "warmed"))
+
+    def load(item):
+        model, status = item
+        started = time.monotonic()
+        try:
+            _load(model, keepalive)
+        except Exception as e:
+            return model, {"status": "error", "error": _error(e)}
+        seconds = round(time.monotonic() - started, 3)
+        return model, {"status": status, "seconds": seconds}
+
+    if to_load:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(to_load)) as executor:
+            results.update(executor.map(tool_metrics.wrap(load), to_load))
+
+    return {
+        "success": all(r["status"] != "error" for r in results.values()),
+        "keepalive": keepalive,
+        "budget_gb": budget_gb,
+        "models": {model: results[model] for model in dict.fromkeys(models)},
+    }
+
+
+def watch_pool(models: list = None, keepalive: str = None, budget_gb: float = None):
+    """Re-run warm_pool() forever, printing each result as NDJSON."""
+    interval = max(get_settings().ollama_renew_seconds / 2, 1.0)
+    while True:
+        print(json.dumps(warm_pool(models, keepalive, budget_gb)), flush=True)
+        time.sleep(interval)
+
+
+DEFAULT_BENCH_PROMPTS = [
+    "Reply with one word: ready.",
+    "Summarize the benefits of caching in two sentences.",
+    "Write a Python function that reverses a string.",
+    "List three differences between TCP and UDP.",
+]
+
+
+def _percentile(values: list, pct: float) -> float | None:
+    """Linearly interpolated percentile, or None for no values."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
+
+
+def _timed_generate(model: str, prompt: str, keepalive: str, num_predict: int) -> dict:
+    """
+    Stream one generation and time it.
+
+    Returns:
+        dict of client-side timings (seconds) and Ollama's reported
+        durations (nanoseconds in the API, converted to seconds)
+    """
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": keepalive,
+        "options": {"num_predict": num_predict},
+    }
+    from urllib.request import urlopen
+
+    started = time.perf_counter()
+    ttft = None
+    final = {}
+    with urlopen(_request("/api/generate", payload), timeout=LOAD_TIMEOUT) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            if ttft is None and (chunk.get("response") or chunk.get("done")):
+                ttft = time.perf_counter() - started
+            if chunk.get("done"):
+                final = chunk
+                break
+
+    eval_count = final.get("eval_count", 0)
+    eval_duration = final.get("eval_duration", 0) / 1e9
+    return {
+        "ttft": ttft,
+        "total": time.perf_counter() - started,
+        "load": final.get("load_duration", 0) / 1e9,
+        "prompt_eval": final.get("prompt_eval_duration", 0) / 1e9,
+        "eval_count": eval_count,
+        "tokens_per_second": eval_count / eval_duration if eval_duration else None,
+    }
+
+
+def _summarize_runs(runs: list, errors: list, wall: float) -> dict:
+    """Aggregate timed generations into p50/p95 statistics."""
+
+    def stats(key: str, scale: float = 1.0) -> dict:
+        values = [r[key] * scale for r in runs if r[key] is not None]
+        return {
+            "p50": _round(_percentile(values, 50)),
+            "p95": _round(_percentile(values, 95)),
+            "max": _round(max(values, default=None)),
+        }
+
+    tokens = sum(r["eval_count"] for r in runs)
+    return {
+        "requests": len(runs) + len(errors),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "wall_seconds": _round(wall),
+        "requests_per_second": _round(len(runs) / wall if wall else None),
+        "aggregate_tokens_per_second": _round(tokens / wall if wall else None),
+        "ttft_ms": stats("ttft", 1000),
+        "total_ms": stats("total", 1000),
+        "load_ms": stats("load", 1000),
+        "prompt_eval_ms": stats("prompt_eval", 1000),
+        "tokens_per_second": stats("tokens_per_second"),
+    }
+
+
+def benchmark(
+    models: list = None,
+    prompts: list = None,
+    concurrency: list = None,
+    repeat: int = 1,
+    num_predict: int = 64,
+    cold: bool = False,
+    keepalive: str = None,
+) -> dict:
+    """
+    Measure load time, time to first token and throughput.
+
+    Every prompt is sent `repeat` times at each concurrency level.
+
+    Args:
+        models: Models to benchmark (default: OLLAMA_MODEL)
+        prompts: Prompts to send (default: DEFAULT_BENCH_PROMPTS)
+        concurrency: Concurrency levels to test (default: [1])
+        repeat: Times to send each prompt per level
+        num_predict: Maximum tokens to generate per request
+        cold: Unload the model before each level to include load time
+        keepalive: keep_alive for benchmark requests (default: OLLAMA_KEEPALIVE)
+
+    Returns:
+        dict with per-model, per-concurrency statistics
+    """
+    settings = get_settings()
+    models = models or [settings.ollama_model]
+    prompts = prompts or DEFAULT_BENCH_PROMPTS
+    concurrency = concurrency or [1]
+    keepalive = keepalive or settings.ollama_keepalive
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    results = {}
+    for model in models:
+        levels = {}
+        for workers in concurrency:
+            if cold:
+                try:
+                    _api(
+                        "/api/generate",
+                        {"model": model, "keep_alive": 0},
+                        timeout=LOAD_TIMEOUT,
+                    )
+                except Exception as e:
+                    levels[str(workers)] = {"error": _error(e)}
+                    continue
+
+            def run(prompt):
+                try:
+                    return _timed_generate(model, prompt, keepalive, num_predict)
+                except Exception as e:
+                    return e
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(run, prompts * repeat))
+            wall = time.perf_counter() - started
+
+            runs = [o for o in outcomes if isinstance(o, dict)]
+            errors = [_error(o) for o in outcomes if not isinstance(o, dict)]
+            levels[str(workers)] = _summarize_runs(runs, errors, wall)
+        results[model] = levels
+
+    return {
+        "host": settings.ollama_host,
+        "prompts": len(prompts),
+        "repeat": repeat,
+        "num_predict": num_predict,
+        "cold": cold,
+        "results": results,
+    }
+
+
+def read_prompts(path: str) -> list:
+    """Read prompts from a JSON list or a file with one prompt per line."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return [str(p) for p in json.loads(text)]
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--pool", action="store_true")
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--keepalive")
+    parser.add_argument("--budget-gb", type=float)
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--prompts")
+    parser.add_argument("--concurrency", default="1")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--num-predict", type=int, default=64)
+    parser.add_argument("--cold", action="store_true")
+    parser.add_argument("args", nargs="*")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    model = sys.argv[1] if len(sys.argv) > 1 else "qwen3:30b"
-    keepalive = sys.argv[2] if len(sys.argv) > 2 else "60m"
+    tool_metrics.start("warmup_ollama")
+    args = parse_args(sys.argv[1:])
+
+    if args.bench:
+        try:
+            prompts = read_prompts(args.prompts) if args.prompts else None
+            concurrency = [int(c) for c in args.concurrency.split(",") if c]
+            if any(c <= 0 for c in concurrency):
+                raise ValueError(f"--concurrency must be positive: {args.concurrency}")
+        except (OSError, ValueError) as e:
+            print(json.dumps({"error": f"Invalid benchmark options: {str(e)}"}))
+            sys.exit(1)
+        result = benchmark(
+            args.args,
+            prompts,
+            concurrency,
+            args.repeat,
+            args.num_predict,
+            args.cold,
+            args.keepalive,
+        )
+    elif args.pool or args.watch:
+        try:
+            if args.watch:
+                watch_pool(args.args, args.keepalive, args.budget_gb)
+        except KeyboardInterrupt:
+            sys.exit(0)
+        result = warm_pool(args.args, args.keepalive, args.budget_gb)
+    else:
+        model = args.args[0] if len(args.args) > 0 else None
+        keepalive = args.args[1] if len(args.args) > 1 else args.keepalive
+        result = warmup_model(model, keepalive)
 
-    result = warmup_model(model, keepalive)
     print(json.dumps(result, indent=2))
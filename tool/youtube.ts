@@ -1,4 +1,5 @@
 import { tool } from "@opencode-ai/plugin"
+import { callTool } from "./lib/tool_client"
 
 const TOOL_DIR = `${process.env.HOME}/.config/opencode/tool`
 const VENV_PYTHON = `${process.env.HOME}/.config/opencode/.venv/bin/python`
@@ -8,12 +9,47 @@ const VENV_PYTHON = `${process.env.HOME}/.config/opencode/.venv/bin/python`
  * Fetches video transcripts from YouTube URLs
  */
 export const get_transcript = tool({
-  description: "Fetch the transcript from a YouTube video. Returns the full transcript text, video metadata, and timestamped segments.",
+  description: "Fetch the transcript from a YouTube video. Returns the transcript text (optionally limited to a time window), video metadata, and optionally timestamped segments.",
   args: {
-    url: tool.schema.string().describe("YouTube URL or video ID (e.g., https://www.youtube.com/watch?v=VIDEO_ID or just VIDEO_ID)")
+    url: tool.schema.string().describe("YouTube URL or video ID (e.g., https://www.youtube.com/watch?v=VIDEO_ID or just VIDEO_ID)"),
+    languages: tool.schema.array(tool.schema.string()).optional().describe("Preferred transcript language codes, most preferred first (e.g., [\"en\", \"de\"])"),
+    from: tool.schema.string().optional().describe("Only return the transcript from this time (seconds, M:SS or H:MM:SS)"),
+    to: tool.schema.string().optional().describe("Only return the transcript up to this time (seconds, M:SS or H:MM:SS)"),
+    segments: tool.schema.boolean().optional().describe("Include timestamped segments (column-wise start/duration/text arrays)"),
+    chunk_tokens: tool.schema.number().optional().describe("Return the transcript as timestamped windows of about this many tokens instead of one string"),
+    chunk_overlap: tool.schema.number().optional().describe("Tokens shared between consecutive windows (default 0)"),
+    chunk_index: tool.schema.number().optional().describe("Only return this window (chunk_count reports how many there are)"),
+    query: tool.schema.string().optional().describe("Return only the timestamped passages that best answer this question instead of the full transcript"),
+    top_k: tool.schema.number().optional().describe("Maximum number of passages for a query (default 5)"),
+    max_tokens: tool.schema.number().optional().describe("Total token budget for the returned passages")
   },
   async execute(args) {
-    const result = await Bun.$`${VENV_PYTHON} ${TOOL_DIR}/yt_transcript.py ${args.url}`.text()
+    const languages = args.languages || []
+    const served = await callTool("get_transcript", {
+      url: args.url,
+      languages,
+      time_from: args.from,
+      time_to: args.to,
+      segments: args.segments || false,
+      chunk_tokens: args.chunk_tokens,
+      chunk_overlap: args.chunk_overlap || 0,
+      chunk_index: args.chunk_index,
+      query: args.query,
+      top_k: args.top_k || 5,
+      max_tokens: args.max_tokens
+    })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
+    const options = ["--lang", languages.join(",")]
+    if (args.from) options.push("--from", args.from)
+    if (args.to) options.push("--to", args.to)
+    if (args.segments) options.push("--segments")
+    if (args.chunk_tokens) options.push("--chunk-tokens", String(args.chunk_tokens))
+    if (args.chunk_overlap) options.push("--chunk-overlap", String(args.chunk_overlap))
+    if (args.chunk_index !== undefined) options.push("--chunk", String(args.chunk_index))
+    if (args.query) options.push("--query", args.query, "--top-k", String(args.top_k || 5))
+    if (args.max_tokens) options.push("--max-tokens", String(args.max_tokens))
+    const result = await Bun.$`${VENV_PYTHON} ${TOOL_DIR}/yt_transcript.py ${args.url} ${options}`.text()
     return result.trim()
   }
 })
@@ -31,6 +67,14 @@ export const save_query = tool({
     video_id: tool.schema.string().optional().describe("Optional video ID for reference")
   },
   async execute(args) {
+    const served = await callTool("save_yt_query", {
+      video_url: args.video_url,
+      query: args.query,
+      answer: args.answer,
+      video_id: args.video_id || null
+    })
+    if (served !== undefined) return JSON.stringify(served, null, 2)
+
     const videoId = args.video_id || ""
     const result = await Bun.$`${VENV_PYTHON} ${TOOL_DIR}/save_yt_query.py ${args.video_url} ${args.query} ${args.answer} ${videoId}`.text()
     return result.trim()
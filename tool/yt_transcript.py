@@ -2,24 +2,66 @@
 """
 YouTube Transcript Tool for OpenCode.
 Fetches video transcripts from YouTube URLs.
+
+Fetched transcripts are cached on disk, keyed by (video_id, language), in
+~/.cache/opencode/yt_transcripts.sqlite3 (override with
+OPENCODE_TRANSCRIPT_CACHE). Segments are stored column-wise as
+zlib-compressed JSON; least recently used videos are evicted once the
+cache exceeds YT_TRANSCRIPT_CACHE_MB (default 256).
+
+Usage:
+    yt_transcript.py <youtube_url> [--lang en,de] [--prefetch] [--no-cache]
+    yt_transcript.py <url1> <url2> ... [options]
+    yt_transcript.py --batch <urls.txt | -> [options]
+
+--lang lists preferred transcript languages; --prefetch also downloads
+the runner-up track in parallel in case the best one fails. With more
+than one URL (or --batch, one URL per line) transcripts are fetched
+concurrently and printed as one NDJSON record per video as they finish.
+
+--from/--to (seconds, M:SS or H:MM:SS) limit the transcript text to one
+time window; --segments adds timestamped segments, packed column-wise as
+{"start": [...], "duration": [...], "text": [...]}.
+
+--chunk-tokens N returns the text as overlapping windows of about N
+tokens (counted with the count_tokens.py encoding) with start/end times;
+--chunk I returns only window I, for map-reduce over long videos. Token
+counts per segment are kept in the transcript cache, so paging through
+the windows of a cached video does not re-tokenize it.
+
+--query "..." returns only the --top-k (default 5) timestamped passages
+that best match the question (BM25 over ~30 s windows), optionally capped
+at --max-tokens in total. The window index is built once per video and
+kept in the transcript cache next to the segments.
+
+YT_TRANSCRIPT_ENDPOINT (e.g. http://127.0.0.1:8765) sends every request
+meant for https://www.youtube.com to that base URL instead, so the tool
+can run against a local stand-in. It is read from the process
+environment only, never from a .env file.
 """
 
+import argparse
 import json
+import math
+import os
 import re
+import sqlite3
 import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 
+import tool_metrics
+from tool_config import get_settings, venv_site_packages
+
 # Add the venv site-packages to path
-venv_site_packages = Path.home() / ".config" / "opencode" / ".venv" / "lib"
-for p in venv_site_packages.glob("python*/site-packages"):
-    sys.path.insert(0, str(p))
-
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import (
-    NoTranscriptFound,
-    TranscriptsDisabled,
-    VideoUnavailable,
-)
+for p in reversed(venv_site_packages(get_settings().opencode_venv)):
+    sys.path.insert(0, p)
 
 
 def extract_video_id(url: str) -> str | None:
@@ -46,12 +88,864 @@ def extract_video_id(url: str) -> str | None:
     return None
 
 
-def get_transcript(url: str) -> dict:
+CACHE_PATH = Path(
+    os.environ.get(
+        "OPENCODE_TRANSCRIPT_CACHE",
+        Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+        / "opencode"
+        / "yt_transcripts.sqlite3",
+    )
+)
+
+
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_cache() -> sqlite3.Connection | None:
+    """
+    Open the transcript cache, once per process.
+
+    The connection is shared by every thread (tool_server.py serves each
+    request on its own); statements on it are serialized by _cache_lock.
+
+    Returns:
+        SQLite connection, or None if the cache cannot be opened
+    """
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            CACHE_PATH, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transcripts (
+                video_id TEXT NOT NULL,
+                requested_language TEXT NOT NULL,
+                language TEXT,
+                is_generated INTEGER,
+                segments BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (video_id, requested_language)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS passage_index (
+                video_id TEXT NOT NULL,
+                requested_language TEXT NOT NULL,
+                window_seconds REAL NOT NULL,
+                postings BLOB NOT NULL,
+                PRIMARY KEY (video_id, requested_language)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segment_tokens (
+                video_id TEXT NOT NULL,
+                requested_language TEXT NOT NULL,
+                encoding TEXT NOT NULL,
+                counts BLOB NOT NULL,
+                PRIMARY KEY (video_id, requested_language, encoding)
+            )
+            """
+        )
+        return conn
+    except sqlite3.Error:
+        return None
+
+
+def pack_segments(segments: list) -> bytes:
+    """Store segments column-wise as zlib-compressed JSON."""
+    columns = {
+        "start": [s["start"] for s in segments],
+        "duration": [s["duration"] for s in segments],
+        "text": [s["text"] for s in segments],
+    }
+    return zlib.compress(json.dumps(columns, separators=(",", ":")).encode(), 6)
+
+
+def unpack_segments(blob: bytes) -> list:
+    """Inverse of pack_segments()."""
+    columns = json.loads(zlib.decompress(blob))
+    return [
+        {"text": text, "start": start, "duration": duration}
+        for text, start, duration in zip(
+            columns["text"], columns["start"], columns["duration"]
+        )
+    ]
+
+
+def cache_get(video_id: str, requested_language: str = "") -> tuple | None:
+    """
+    Look up a cached transcript.
+
+    Returns:
+        Tuple of (language, is_generated, segments), or None
+    """
+    conn = get_cache()
+    if conn is None:
+        return None
+    try:
+        with _cache_lock:
+            row = conn.execute(
+                "SELECT language, is_generated, segments FROM transcripts "
+                "WHERE video_id = ? AND requested_language = ?",
+                (video_id, requested_language),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE transcripts SET last_used = ? "
+                "WHERE video_id = ? AND requested_language = ?",
+                (time.time(), video_id, requested_language),
+            )
+        language, is_generated, blob = row
+        is_generated = None if is_generated is None else bool(is_generated)
+        return language, is_generated, unpack_segments(blob)
+    except (sqlite3.Error, zlib.error, ValueError, KeyError):
+        return None
+
+
+def cache_put(
+    video_id: str,
+    requested_language: str,
+    language: str,
+    is_generated: bool,
+    segments: list,
+) -> None:
+    """Store a transcript and evict least recently used ones over the size cap."""
+    conn = get_cache()
+    if conn is None:
+        return
+    max_bytes = get_settings().yt_transcript_cache_mb * 1024 * 1024
+    blob = pack_segments(segments)
+    try:
+        with _cache_lock, conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(video_id, requested_language, language, is_generated, segments, "
+                "size, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    video_id,
+                    requested_language,
+                    language,
+                    is_generated,
+                    blob,
+                    len(blob),
+                    time.time(),
+                ),
+            )
+            # Drop everything beyond the most recent max_bytes of transcripts
+            conn.execute(
+                """
+                DELETE FROM transcripts WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, SUM(size) OVER (ORDER BY last_used DESC) AS total
+                        FROM transcripts
+                    ) WHERE total > ?
+                )
+                """,
+                (max_bytes,),
+            )
+            # Passage indexes and token counts live and die with their transcript
+            for table in ("passage_index", "segment_tokens"):
+                conn.execute(
+                    f"""
+                    DELETE FROM {table} WHERE NOT EXISTS (
+                        SELECT 1 FROM transcripts t
+                        WHERE t.video_id = {table}.video_id
+                        AND t.requested_language = {table}.requested_language
+                    )
+                    """
+                )
+    except sqlite3.Error:
+        pass
+
+
+def parse_timestamp(value: str) -> float:
+    """
+    Parse "754", "754.5", "12:34" or "1:02:03" into seconds.
+
+    Raises:
+        ValueError: If the value is not a timestamp
+    """
+    seconds = 0.0
+    for part in str(value).strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as H:MM:SS or M:SS."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def segment_starts(segments: list) -> array:
+    """Start times of segments, as the bisect keys for segment_range()."""
+    return array("d", (segment["start"] for segment in segments))
+
+
+def segment_range(
+    segments: list,
+    time_from: float = None,
+    time_to: float = None,
+    starts: array = None,
+) -> tuple:
+    """
+    Find the index range of the segments overlapping [time_from, time_to).
+
+    Segment boundaries are found by binary search over the start times.
+    Given starts (built once per transcript with segment_starts()), the
+    cost is logarithmic in the transcript length; otherwise building the
+    array makes it linear.
+
+    Args:
+        segments: Segments ordered by start time
+        time_from: Window start in seconds (default: beginning)
+        time_to: Window end in seconds (default: end)
+        starts: segment_starts() of segments, if already built
+
+    Returns:
+        Tuple of (first, last) segment indexes, last exclusive
+    """
+    if starts is None:
+        starts = segment_starts(segments)
+
+    first = 0
+    if time_from is not None:
+        # The segment starting at or before time_from may still be playing
+        first = max(bisect_right(starts, time_from) - 1, 0)
+        if first < len(segments):
+            segment = segments[first]
+            if segment["start"] + segment["duration"] <= time_from:
+                first += 1
+
+    last = len(segments)
+    if time_to is not None:
+        last = bisect_left(starts, time_to)
+
+    return first, last
+
+
+def pack_segments_output(segments: list) -> dict:
+    """Compact column-wise segment encoding for tool output."""
+    return {
+        "start": [round(segment["start"], 2) for segment in segments],
+        "duration": [round(segment["duration"], 2) for segment in segments],
+        "text": [segment["text"] for segment in segments],
+    }
+
+
+def missing_tokenizer(needs: str, error: ImportError) -> dict:
+    """Error result naming which tokenizer module could not be imported."""
+    if error.name == "count_tokens":
+        return {"error": f"{needs} count_tokens.py next to yt_transcript.py"}
+    return {"error": f"{needs} tiktoken: {str(error)}"}
+
+
+def segment_token_counts(segments: list, encoding_name: str = None) -> list:
+    """
+    Count each segment's tokens with the count_tokens.py encoder.
+
+    Segments are joined with spaces in chunk text, so each is counted
+    with a leading space.
+
+    Raises:
+        ImportError: If count_tokens.py or tiktoken is unavailable
+    """
+    from count_tokens import DEFAULT_ENCODING, get_encoder
+
+    encoder = get_encoder(encoding_name or DEFAULT_ENCODING)
+    batch = encoder.encode_ordinary_batch([" " + s["text"] for s in segments])
+    return [len(tokens) for tokens in batch]
+
+
+def token_counts_get(
+    video_id: str, requested_language: str, encoding_name: str
+) -> list | None:
+    """Load stored segment_token_counts() for a cached transcript."""
+    conn = get_cache()
+    if conn is None:
+        return None
+    try:
+        with _cache_lock:
+            row = conn.execute(
+                "SELECT counts FROM segment_tokens "
+                "WHERE video_id = ? AND requested_language = ? AND encoding = ?",
+                (video_id, requested_language, encoding_name),
+            ).fetchone()
+        return None if row is None else json.loads(zlib.decompress(row[0]))
+    except (sqlite3.Error, zlib.error, ValueError):
+        return None
+
+
+def token_counts_put(
+    video_id: str, requested_language: str, encoding_name: str, counts: list
+) -> None:
+    """Store segment_token_counts() next to its cached transcript."""
+    conn = get_cache()
+    if conn is None:
+        return
+    blob = zlib.compress(json.dumps(counts, separators=(",", ":")).encode(), 6)
+    try:
+        with _cache_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO segment_tokens "
+                "(video_id, requested_language, encoding, counts) VALUES (?, ?, ?, ?)",
+                (video_id, requested_language, encoding_name, blob),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def chunk_bounds(token_counts: list, max_tokens: int, overlap_tokens: int = 0):
+    """
+    Lay out token-budgeted, overlapping windows over segment token counts.
+
+    A window holds whole segments up to max_tokens (a single oversized
+    segment becomes its own window); the next window starts up to
+    overlap_tokens before the previous one ended.
+
+    Args:
+        token_counts: Tokens per segment (see segment_token_counts())
+        max_tokens: Target token budget per window
+        overlap_tokens: Tokens repeated between consecutive windows
+
+    Yields:
+        Tuples of (first, last, tokens), segment indexes with last exclusive
+    """
+    first = 0
+    while first < len(token_counts):
+        tokens = 0
+        last = first
+        while last < len(token_counts) and (
+            last == first or tokens + token_counts[last] <= max_tokens
+        ):
+            tokens += token_counts[last]
+            last += 1
+
+        yield first, last, tokens
+        if last >= len(token_counts):
+            break
+
+        # Step back for the overlap, always moving forward overall
+        next_first = last
+        overlap = 0
+        while next_first - 1 > first:
+            step = token_counts[next_first - 1]
+            if overlap + step > overlap_tokens:
+                break
+            next_first -= 1
+            overlap += step
+        first = next_first
+
+
+def make_chunk(segments: list, index: int, first: int, last: int, tokens: int) -> dict:
+    """Render one chunk_bounds() window of segments."""
+    window = segments[first:last]
+    return {
+        "index": index,
+        "start": round(window[0]["start"], 2),
+        "end": round(window[-1]["start"] + window[-1]["duration"], 2),
+        "tokens": tokens,
+        "text": " ".join(segment["text"] for segment in window),
+    }
+
+
+# Passage retrieval: overlapping time windows ranked with BM25
+PASSAGE_WINDOW_SECONDS = 30.0
+PASSAGE_STEP_SECONDS = 15.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize_terms(text: str) -> list:
+    """Lowercase word terms used for passage retrieval."""
+    return re.findall(r"\w+", text.lower())
+
+
+def build_passage_index(segments: list, starts: array = None) -> dict:
+    """
+    Split segments into overlapping time windows and count their terms.
+
+    A window starts every PASSAGE_STEP_SECONDS and holds the segments
+    starting within PASSAGE_WINDOW_SECONDS of its first segment.
+
+    Args:
+        segments: Segments ordered by start time
+        starts: segment_starts() of segments, if already built
+
+    Returns:
+        dict with window bounds ("first"/"last" segment indexes, last
+        exclusive) and per-window term frequencies ("terms")
+    """
+    if starts is None:
+        starts = segment_starts(segments)
+    segment_terms = [Counter(tokenize_terms(s["text"])) for s in segments]
+
+    index = {"first": [], "last": [], "terms": []}
+    first = 0
+    while first < len(segments):
+        window_end = starts[first] + PASSAGE_WINDOW_SECONDS
+        next_start = starts[first] + PASSAGE_STEP_SECONDS
+        last = max(bisect_left(starts, window_end), first + 1)
+        terms = Counter()
+        for counts in segment_terms[first:last]:
+            terms.update(counts)
+        index["first"].append(first)
+        index["last"].append(last)
+        index["terms"].append(dict(terms))
+        if last >= len(segments):
+            break
+        first = max(bisect_left(starts, next_start), first + 1)
+    return index
+
+
+def passage_index_get(video_id: str, requested_language: str) -> dict | None:
+    """Load a stored passage index built with the current window size."""
+    conn = get_cache()
+    if conn is None:
+        return None
+    try:
+        with _cache_lock:
+            row = conn.execute(
+                "SELECT postings FROM passage_index "
+                "WHERE video_id = ? AND requested_language = ? AND window_seconds = ?",
+                (video_id, requested_language, PASSAGE_WINDOW_SECONDS),
+            ).fetchone()
+        return None if row is None else json.loads(zlib.decompress(row[0]))
+    except (sqlite3.Error, zlib.error, ValueError):
+        return None
+
+
+def passage_index_put(video_id: str, requested_language: str, index: dict) -> None:
+    """Store a passage index next to its cached transcript."""
+    conn = get_cache()
+    if conn is None:
+        return
+    blob = zlib.compress(json.dumps(index, separators=(",", ":")).encode(), 6)
+    try:
+        with _cache_lock:
+            conn.execute(
+                "INSERT OR REPLACE INTO passage_index "
+                "(video_id, requested_language, window_seconds, postings) "
+                "VALUES (?, ?, ?, ?)",
+                (video_id, requested_language, PASSAGE_WINDOW_SECONDS, blob),
+            )
+    except sqlite3.Error:
+        pass
+
+
+def search_passages(
+    segments: list,
+    index: dict,
+    query: str,
+    top_k: int = 5,
+    max_tokens: int = None,
+    time_from: float = None,
+    time_to: float = None,
+) -> list:
+    """
+    Rank transcript windows against a query with BM25.
+
+    Windows overlapping an already selected passage are skipped, and
+    selection stops once top_k passages or max_tokens are reached.
+
+    Args:
+        segments: All transcript segments
+        index: build_passage_index() output for the segments
+        query: Question or keywords
+        top_k: Maximum number of passages
+        max_tokens: Total token budget for passage text (needs tiktoken)
+        time_from: Only consider windows ending after this many seconds
+        time_to: Only consider windows starting before this many seconds
+
+    Returns:
+        Passages in rank order, with start/end seconds, score and text
+
+    Raises:
+        ImportError: If max_tokens is set and count_tokens.py or tiktoken
+            is unavailable
+    """
+    encoder = None
+    if max_tokens:
+        from count_tokens import get_encoder
+
+        encoder = get_encoder()
+
+    windows = index["terms"]
+    lengths = [sum(terms.values()) for terms in windows]
+    average = sum(lengths) / len(lengths) if lengths else 0.0
+    query_terms = set(tokenize_terms(query))
+
+    # Only the query's terms need document frequencies
+    idf = {}
+    for term in query_terms:
+        df = sum(1 for terms in windows if term in terms)
+        if df:
+            idf[term] = math.log(1 + (len(windows) - df + 0.5) / (df + 0.5))
+
+    scored = []
+    for i, terms in enumerate(windows):
+        score = 0.0
+        for term, weight in idf.items():
+            tf = terms.get(term)
+            if tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[i] / average)
+                score += weight * tf * (BM25_K1 + 1) / (tf + norm)
+        if score > 0:
+            scored.append((score, i))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    passages = []
+    taken = []
+    used_tokens = 0
+    for score, i in scored:
+        first, last = index["first"][i], index["last"][i]
+        window = segments[first:last]
+        start = window[0]["start"]
+        end = window[-1]["start"] + window[-1]["duration"]
+        if time_from is not None and end <= time_from:
+            continue
+        if time_to is not None and start >= time_to:
+            continue
+        if any(first < t_last and t_first < last for t_first, t_last in taken):
+            continue
+
+        passage = {
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "timestamp": format_timestamp(start),
+            "score": round(score, 4),
+            "text": " ".join(segment["text"] for segment in window),
+        }
+        if encoder is not None:
+            passage["tokens"] = len(encoder.encode_ordinary(passage["text"]))
+            if used_tokens + passage["tokens"] > max_tokens:
+                continue
+            used_tokens += passage["tokens"]
+
+        passages.append(passage)
+        taken.append((first, last))
+        if len(passages) >= top_k:
+            break
+    return passages
+
+
+def build_result(
+    video_id: str,
+    language: str,
+    is_generated: bool,
+    segments: list,
+    time_from: float = None,
+    time_to: float = None,
+    include_segments: bool = False,
+    chunk_tokens: int = None,
+    chunk_overlap: int = 0,
+    chunk_index: int = None,
+    query: str = None,
+    top_k: int = 5,
+    max_tokens: int = None,
+    passage_index: dict = None,
+    starts: array = None,
+    token_counts: list = None,
+) -> dict:
+    """
+    Assemble the tool output from transcript segments.
+
+    Args:
+        video_id: YouTube video ID
+        language: Transcript language code
+        is_generated: Whether the track is auto-generated
+        segments: All transcript segments
+        time_from: Only include text from this many seconds in
+        time_to: Only include text before this many seconds in
+        include_segments: Add timestamped segments (column-wise)
+        chunk_tokens: Return the text as windows of about this many tokens
+            ("chunks") instead of one "transcript" string
+        chunk_overlap: Tokens shared between consecutive chunks
+        chunk_index: Only return this chunk (chunk_count is still reported)
+        query: Return the best matching "passages" for this question
+            instead of the full text
+        top_k: Maximum number of passages
+        max_tokens: Total token budget for passages
+        passage_index: Prebuilt build_passage_index() output, if any
+        starts: segment_starts() of segments, if already built
+        token_counts: segment_token_counts() of segments, if already known
+
+    Returns:
+        Tool output dict
+    """
+    if query and chunk_tokens:
+        return {"error": "Use either a query or chunking, not both"}
+
+    # Calculate total duration from last segment
+    duration_seconds = 0
+    if segments:
+        last_segment = segments[-1]
+        duration_seconds = int(last_segment["start"] + last_segment["duration"])
+
+    windowed = time_from is not None or time_to is not None
+    all_segments = segments
+    first, last = 0, len(segments)
+    if windowed:
+        first, last = segment_range(segments, time_from, time_to, starts)
+        segments = segments[first:last]
+
+    result = {
+        "video_id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "language": language,
+        "is_auto_generated": is_generated,
+        "duration_seconds": duration_seconds,
+    }
+
+    if query:
+        try:
+            result["query"] = query
+            result["passages"] = search_passages(
+                all_segments,
+                passage_index or build_passage_index(all_segments, starts),
+                query,
+                top_k,
+                max_tokens,
+                time_from,
+                time_to,
+            )
+        except ImportError as e:
+            return missing_tokenizer("Token budgets require", e)
+    elif chunk_tokens:
+        try:
+            if token_counts is None:
+                token_counts = segment_token_counts(all_segments)
+        except ImportError as e:
+            return missing_tokenizer("Chunking requires", e)
+        # Windows are laid out from the counts alone; only the returned
+        # ones are rendered
+        bounds = list(
+            chunk_bounds(token_counts[first:last], chunk_tokens, chunk_overlap)
+        )
+        chunk_count = len(bounds)
+        if chunk_index is None:
+            selected = range(chunk_count)
+        elif 0 <= chunk_index < chunk_count:
+            selected = [chunk_index]
+        else:
+            return {
+                "error": f"Chunk {chunk_index} out of range ({chunk_count} chunks)"
+            }
+        result["chunk_count"] = chunk_count
+        result["chunks"] = [make_chunk(segments, i, *bounds[i]) for i in selected]
+    else:
+        # Combine transcript segments into full text
+        result["transcript"] = " ".join([segment["text"] for segment in segments])
+
+    if windowed:
+        result["range"] = {
+            "from": format_timestamp(time_from or 0),
+            "to": format_timestamp(duration_seconds if time_to is None else time_to),
+        }
+    if include_segments:
+        result["segments"] = pack_segments_output(segments)
+    return result
+
+
+class RateLimiter:
+    """Token bucket allowing bursts of `rate` requests, refilled per second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            refill = (now - self.updated) * self.rate
+            self.tokens = min(self.rate, self.tokens + refill)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+# Shared by every request this process makes to YouTube
+_rate_limiter = RateLimiter(get_settings().yt_transcript_rate)
+
+
+YOUTUBE_ORIGIN = "https://www.youtube.com"
+
+
+def _endpoint_adapter(endpoint: str):
+    """A requests adapter that redirects YOUTUBE_ORIGIN to another base URL."""
+    from requests.adapters import HTTPAdapter
+
+    class EndpointAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            request.url = endpoint.rstrip("/") + request.url[len(YOUTUBE_ORIGIN) :]
+            return super().send(request, **kwargs)
+
+    return EndpointAdapter()
+
+
+def _count_response(response, *args, **kwargs):
+    tool_metrics.count("bytes_in", len(response.content))
+
+
+def _http_client():
+    """
+    requests Session honouring YT_TRANSCRIPT_ENDPOINT and OPENCODE_METRICS,
+    or None for the library default.
+    """
+    endpoint = get_settings().yt_transcript_endpoint
+    if not endpoint and not tool_metrics.ENABLED:
+        return None
+    from requests import Session
+
+    session = Session()
+    if endpoint:
+        session.mount(YOUTUBE_ORIGIN + "/", _endpoint_adapter(endpoint))
+    if tool_metrics.ENABLED:
+        session.hooks["response"].append(_count_response)
+    return session
+
+
+def _fetch(track):
+    _rate_limiter.wait()
+    with tool_metrics.span("network"):
+        return track.fetch()
+
+
+def rank_tracks(transcript_list, languages: list = None) -> list:
+    """
+    Rank available transcript tracks in a single pass over their metadata.
+
+    Tracks are ordered by position in the preferred language list (tracks
+    in other languages come last), then manual before auto-generated,
+    then the order YouTube lists them. Without languages this reproduces
+    "first manual track, else first generated track".
+
+    Args:
+        transcript_list: Iterable of transcript tracks from the API
+        languages: Preferred language codes, most preferred first
+
+    Returns:
+        Tracks, best candidate first
+    """
+    preference = {code: rank for rank, code in enumerate(languages or [])}
+    ranked = sorted(
+        enumerate(transcript_list),
+        key=lambda item: (
+            preference.get(item[1].language_code, len(preference)),
+            item[1].is_generated,
+            item[0],
+        ),
+    )
+    return [track for _, track in ranked]
+
+
+def _track_failed(error: Exception) -> bool:
+    """
+    Whether a fetch error is specific to one track, so the next may work.
+    Blocks, rate limits and failed requests would hit every track alike.
+    """
+    from xml.etree.ElementTree import ParseError
+
+    import youtube_transcript_api as youtube
+
+    if isinstance(error, (youtube.RequestBlocked, youtube.YouTubeRequestFailed)):
+        return False
+    return isinstance(error, (youtube.CouldNotRetrieveTranscript, ParseError))
+
+
+def fetch_best_track(tracks: list, prefetch: bool = False) -> tuple:
+    """
+    Fetch the best track that can be downloaded.
+
+    Only the top candidate is fetched unless it fails. With prefetch, the
+    runner-up is fetched concurrently so a failure of the first costs no
+    extra round trip.
+
+    Args:
+        tracks: Candidates from rank_tracks()
+        prefetch: Fetch the top two candidates in parallel
+
+    Returns:
+        Tuple of (track, fetched transcript), or (None, None)
+
+    Raises:
+        Exception: Errors that are not specific to one track, such as
+            RequestBlocked or network failures
+    """
+    start = 0
+    if prefetch and len(tracks) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            fetch = tool_metrics.wrap(_fetch)
+            futures = [pool.submit(fetch, track) for track in tracks[:2]]
+            for track, future in zip(tracks[:2], futures):
+                try:
+                    return track, future.result()
+                except Exception as e:
+                    if not _track_failed(e):
+                        raise
+        start = 2
+
+    for track in tracks[start:]:
+        try:
+            return track, _fetch(track)
+        except Exception as e:
+            if not _track_failed(e):
+                raise
+    return None, None
+
+
+def get_transcript(
+    url: str,
+    use_cache: bool = True,
+    languages: list = None,
+    prefetch: bool = False,
+    time_from: float = None,
+    time_to: float = None,
+    include_segments: bool = False,
+    chunk_tokens: int = None,
+    chunk_overlap: int = 0,
+    chunk_index: int = None,
+    query: str = None,
+    top_k: int = 5,
+    max_tokens: int = None,
+) -> dict:
     """
     Fetch transcript from a YouTube video.
 
     Args:
         url: YouTube URL or video ID
+        use_cache: Serve and record transcripts in the on-disk cache
+        languages: Preferred language codes, most preferred first
+        prefetch: Also fetch the runner-up track in parallel
+        time_from: Only return text from this many seconds in
+        time_to: Only return text before this many seconds in
+        include_segments: Add timestamped segments to the output
+        chunk_tokens: Split the text into windows of about this many tokens
+        chunk_overlap: Tokens shared between consecutive windows
+        chunk_index: Only return this window
+        query: Only return the passages that best match this question
+        top_k: Maximum number of passages
+        max_tokens: Total token budget for passages
 
     Returns:
         dict with video_id, transcript text, and metadata
@@ -61,90 +955,281 @@ def get_transcript(url: str) -> dict:
     if not video_id:
         return {"error": f"Could not extract video ID from URL: {url}"}
 
+    output = {
+        "time_from": time_from,
+        "time_to": time_to,
+        "include_segments": include_segments,
+        "chunk_tokens": chunk_tokens,
+        "chunk_overlap": chunk_overlap,
+        "chunk_index": chunk_index,
+        "query": query,
+        "top_k": top_k,
+        "max_tokens": max_tokens,
+    }
+
+    requested_language = ",".join(languages or [])
+
+    def finish(language: str, is_generated: bool, segments: list) -> dict:
+        starts = None
+        index = None
+        token_counts = None
+        if chunk_tokens and not query:
+            # Count segment tokens once per video and keep them cached
+            try:
+                from count_tokens import DEFAULT_ENCODING
+            except ImportError as e:
+                return missing_tokenizer("Chunking requires", e)
+
+            if use_cache:
+                with tool_metrics.span("cache"):
+                    token_counts = token_counts_get(
+                        video_id, requested_language, DEFAULT_ENCODING
+                    )
+            if token_counts is None or len(token_counts) != len(segments):
+                try:
+                    with tool_metrics.span("encode"):
+                        token_counts = segment_token_counts(segments, DEFAULT_ENCODING)
+                except ImportError:
+                    # build_result() reports it
+                    token_counts = None
+                else:
+                    if use_cache:
+                        with tool_metrics.span("cache"):
+                            token_counts_put(
+                                video_id,
+                                requested_language,
+                                DEFAULT_ENCODING,
+                                token_counts,
+                            )
+        if query:
+            # Build the passage index once per video and keep it cached
+            with tool_metrics.span("cache"):
+                index = use_cache and passage_index_get(video_id, requested_language)
+            if not index:
+                # Bisect keys shared with the time window in build_result()
+                starts = segment_starts(segments)
+                with tool_metrics.span("index"):
+                    index = build_passage_index(segments, starts)
+                if use_cache:
+                    with tool_metrics.span("cache"):
+                        passage_index_put(video_id, requested_language, index)
+        with tool_metrics.span("render"):
+            return build_result(
+                video_id,
+                language,
+                is_generated,
+                segments,
+                passage_index=index,
+                starts=starts,
+                token_counts=token_counts,
+                **output,
+            )
+
+    if use_cache:
+        with tool_metrics.span("cache"):
+            cached = cache_get(video_id, requested_language)
+        if cached is not None:
+            tool_metrics.count("cache_hits")
+            return finish(*cached)
+        tool_metrics.count("cache_misses")
+
+    # Imported only on a cache miss; it (with requests) dominates startup
+    try:
+        with tool_metrics.span("import"):
+            import youtube_transcript_api as youtube
+    except ImportError as e:
+        return {"error": f"youtube_transcript_api is not installed: {str(e)}"}
+
     try:
         # Create API instance
-        ytt_api = YouTubeTranscriptApi()
+        ytt_api = youtube.YouTubeTranscriptApi(http_client=_http_client())
 
         # Get list of available transcripts
-        transcript_list = ytt_api.list(video_id)
+        _rate_limiter.wait()
+        with tool_metrics.span("network"):
+            transcript_list = ytt_api.list(video_id)
 
-        # Try to get the original transcript first (manually created)
-        transcript = None
-        language = None
-        is_generated = None
-
-        # First, try manually created transcripts
-        try:
-            for t in transcript_list:
-                if not t.is_generated:
-                    transcript = t.fetch()
-                    language = t.language_code
-                    is_generated = False
-                    break
-        except Exception:
-            pass
-
-        # If no manual transcript, get auto-generated
-        if transcript is None:
-            try:
-                for t in transcript_list:
-                    if t.is_generated:
-                        transcript = t.fetch()
-                        language = t.language_code
-                        is_generated = True
-                        break
-            except Exception:
-                pass
+        # Prefer manually created tracks in the preferred languages
+        track, transcript = fetch_best_track(
+            rank_tracks(transcript_list, languages), prefetch
+        )
 
         if transcript is None:
             return {"error": "No transcript available for this video"}
 
-        # Combine transcript segments into full text
-        full_text = " ".join([segment.text for segment in transcript])
+        language = track.language_code
+        is_generated = track.is_generated
 
         # Convert to list of dicts for JSON serialization
-        segments = [
-            {
-                "text": segment.text,
-                "start": segment.start,
-                "duration": segment.duration,
-            }
-            for segment in transcript
-        ]
+        with tool_metrics.span("parse"):
+            segments = [
+                {
+                    "text": segment.text,
+                    "start": segment.start,
+                    "duration": segment.duration,
+                }
+                for segment in transcript
+            ]
 
-        # Calculate total duration from last segment
-        duration_seconds = 0
-        if segments:
-            last_segment = segments[-1]
-            duration_seconds = int(last_segment["start"] + last_segment["duration"])
+        if use_cache:
+            with tool_metrics.span("cache"):
+                cache_put(
+                    video_id, requested_language, language, is_generated, segments
+                )
 
-        return {
-            "video_id": video_id,
-            "url": f"https://www.youtube.com/watch?v={video_id}",
-            "language": language,
-            "is_auto_generated": is_generated,
-            "duration_seconds": duration_seconds,
-            "transcript": full_text,
-            # segments omitted to reduce output size
-        }
+        return finish(language, is_generated, segments)
 
-    except TranscriptsDisabled:
+    except youtube.TranscriptsDisabled:
         return {"error": f"Transcripts are disabled for video: {video_id}"}
-    except NoTranscriptFound:
+    except youtube.NoTranscriptFound:
         return {"error": f"No transcript found for video: {video_id}"}
-    except VideoUnavailable:
+    except youtube.VideoUnavailable:
         return {
             "error": f"Video is unavailable (private, deleted, or age-restricted): {video_id}"
         }
+    except youtube.RequestBlocked:
+        return {
+            "error": f"YouTube is blocking requests from this IP (rate limited or banned): {video_id}"
+        }
     except Exception as e:
         return {"error": f"Error fetching transcript: {str(e)}"}
 
 
+def get_transcripts(urls: list, workers: int = None, **kwargs):
+    """
+    Fetch transcripts for many videos concurrently.
+
+    Inputs are resolved with extract_video_id() and de-duplicated. Up to
+    `workers` videos are fetched at once (default YT_TRANSCRIPT_WORKERS),
+    sharing the process-wide YouTube rate limit (YT_TRANSCRIPT_RATE
+    requests/second). A failing video yields its own error record.
+
+    Args:
+        urls: YouTube URLs or video IDs
+        workers: Number of videos fetched at once
+        **kwargs: Passed through to get_transcript()
+
+    Yields:
+        One result dict per video, with "input" added, in completion order
+    """
+    workers = workers or get_settings().yt_transcript_workers
+
+    seen = set()
+    unique = []
+    for url in urls:
+        video_id = extract_video_id(url)
+        if video_id is None:
+            yield {
+                "input": url,
+                "error": f"Could not extract video ID from URL: {url}",
+            }
+        elif video_id not in seen:
+            seen.add(video_id)
+            unique.append(url)
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    def run(url: str) -> dict:
+        try:
+            result = get_transcript(url, **kwargs)
+        except Exception as e:
+            result = {"error": f"Error fetching transcript: {str(e)}"}
+        return {"input": url, **result}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        run = tool_metrics.wrap(run)
+        for future in as_completed([pool.submit(run, url) for url in unique]):
+            yield future.result()
+
+
+class JsonArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser that reports usage errors as JSON like the tool output."""
+
+    def error(self, message):
+        print(json.dumps({"error": f"{message}. Usage: {USAGE}"}))
+        sys.exit(1)
+
+
+USAGE = (
+    "yt_transcript.py <youtube_url>... [--batch <file | ->] [--lang en,de] "
+    "[--from T] [--to T] [--segments] [--chunk-tokens N [--chunk-overlap N] "
+    "[--chunk I]] [--query Q [--top-k N] [--max-tokens N]] [--prefetch] "
+    "[--no-cache]"
+)
+
+
+def parse_args(argv: list) -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = JsonArgumentParser(add_help=False)
+    parser.add_argument("urls", nargs="*")
+    parser.add_argument("--batch")
+    parser.add_argument("--lang", default="")
+    parser.add_argument("--prefetch", action="store_true")
+    parser.add_argument("--from", dest="time_from", type=parse_timestamp)
+    parser.add_argument("--to", dest="time_to", type=parse_timestamp)
+    parser.add_argument("--segments", action="store_true")
+    parser.add_argument("--chunk-tokens", type=int)
+    parser.add_argument("--chunk-overlap", type=int, default=0)
+    parser.add_argument("--chunk", dest="chunk_index", type=int)
+    parser.add_argument("--query")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: yt_transcript.py <youtube_url>"}))
+    tool_metrics.start("yt_transcript")
+    args = parse_args(sys.argv[1:])
+    languages = [code.strip() for code in args.lang.split(",") if code.strip()]
+
+    urls = list(args.urls)
+    if args.batch:
+        try:
+            if args.batch == "-":
+                urls += sys.stdin.read().split()
+            else:
+                urls += Path(args.batch).read_text().split()
+        except OSError as e:
+            print(json.dumps({"error": f"Invalid batch input: {str(e)}"}))
+            sys.exit(1)
+
+    if not urls:
+        print(json.dumps({"error": f"Usage: {USAGE}"}))
         sys.exit(1)
 
-    url = sys.argv[1]
-    result = get_transcript(url)
-    print(json.dumps(result, indent=2))
+    if len(urls) == 1 and not args.batch:
+        result = get_transcript(
+            urls[0],
+            args.use_cache,
+            languages,
+            args.prefetch,
+            args.time_from,
+            args.time_to,
+            args.segments,
+            args.chunk_tokens,
+            args.chunk_overlap,
+            args.chunk_index,
+            args.query,
+            args.top_k,
+            args.max_tokens,
+        )
+        print(json.dumps(result, indent=2))
+    else:
+        # One NDJSON record per video as soon as it is fetched
+        for result in get_transcripts(
+            urls,
+            use_cache=args.use_cache,
+            languages=languages,
+            prefetch=args.prefetch,
+            time_from=args.time_from,
+            time_to=args.time_to,
+            include_segments=args.segments,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap=args.chunk_overlap,
+            chunk_index=args.chunk_index,
+            query=args.query,
+            top_k=args.top_k,
+            max_tokens=args.max_tokens,
+        ):
+            print(json.dumps(result), flush=True)
@@ -50,6 +50,7 @@ remove_repo_symlinks "$CONFIG_DIR/skill"
 echo ""
 echo "Removing tool symlinks..."
 remove_repo_symlinks "$CONFIG_DIR/tool"
+remove_repo_symlinks "$CONFIG_DIR/tool/lib"
 
 echo ""
 echo "Removing .work symlinks..."